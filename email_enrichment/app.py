@@ -1,35 +1,21 @@
 import streamlit as st
 import pandas as pd
 from email_enricher1 import EnrichmentEngine
+from batch_job11 import BatchJob, file_hash
+from cache_warmer16 import CacheWarmer
+from cache_snapshot20 import SNAPSHOT_FILE
 from io import BytesIO
 import os
-import time
 import logging
-
-# -----------------------------
-# Ensure log folder exists
-# -----------------------------
-LOG_FOLDER = "log"
-os.makedirs(LOG_FOLDER, exist_ok=True)
-LOG_FILE = os.path.join(LOG_FOLDER, "enrichment_app.log")
+from structured_logging17 import setup_logging
 
 # -----------------------------
 # Logging Configuration
 # -----------------------------
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-# Console logging
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-console_handler.setFormatter(formatter)
-logging.getLogger("").addHandler(console_handler)
-logging.info("📌 Application started. Logs are saved in 'log/enrichment_app.log'")
+# Queue-based, non-blocking: JSON lines in size-rotated log/enrichment_app.log + console.
+# Runs once per process even though Streamlit re-executes this script on every rerun.
+LOG_FOLDER = "log"
+setup_logging(log_dir=LOG_FOLDER, filename="enrichment_app.log")
 
 # -----------------------------
 # Page Config
@@ -43,14 +29,63 @@ st.caption("Automatically enrich emails to identify **company**, **university**,
 # -----------------------------
 @st.cache_resource(show_spinner=False)
 def load_engine():
+    logging.info("📌 Application started. Logs are saved in 'log/enrichment_app.log'")
     logging.info("Loading EnrichmentEngine...")
     engine = EnrichmentEngine()
+    # Start warm from a shipped / fleet-merged cache snapshot when one is present
+    if os.path.exists(SNAPSHOT_FILE):
+        engine.load_snapshot(SNAPSHOT_FILE)
+        logging.info("Loaded cache snapshot %s", SNAPSHOT_FILE)
+    # Refresh hot domains (and those listed in warm_domains.txt) in the background
+    engine.warmer = CacheWarmer(engine, warmup_file="warm_domains.txt").start()
     logging.info("EnrichmentEngine loaded successfully.")
     return engine
 
 engine = load_engine()
 os.makedirs("output", exist_ok=True)
 
+# -----------------------------
+# Batch jobs survive reruns: one background job per uploaded file hash
+# -----------------------------
+@st.cache_data(show_spinner=False)
+def read_upload(file_id: str, name: str, _data: bytes) -> pd.DataFrame:
+    # Cached by file hash, so this (and the log line) runs once per upload, not per rerun
+    df = pd.read_excel(BytesIO(_data)) if name.endswith(".xlsx") else pd.read_csv(BytesIO(_data))
+    logging.info(f"File read successfully: {name}")
+    return df
+
+# Bounded, so finished jobs (and their result columns) don't pile up for the life of the process
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=24 * 3600)
+def get_batch_job(file_id: str, _emails: tuple, attempt: int = 0) -> BatchJob:
+    # `attempt` is part of the cache key: a retry starts a new job for the same file
+    logging.info(f"Starting batch job {file_id[:12]} (attempt {attempt}) for {len(_emails)} emails")
+    return BatchJob(engine, list(_emails), file_id).start()
+
+def show_batch_progress(job: BatchJob, total: int):
+    counts = job.counts()
+    st.progress(counts["done"] / total)
+    col1, col2 = st.columns(2)
+    col1.metric("✅ Success", counts["success"])
+    col2.metric("❌ Failed", counts["failed"])
+    st.dataframe(job.snapshot(), use_container_width=True, height=400)
+
+@st.fragment(run_every=1)
+def poll_batch_job(job: BatchJob, total: int):
+    # Only this fragment reruns every second; the single-email tab is left alone
+    if job.finished:
+        # One full rerun swaps the poller for the final results and downloads
+        st.rerun()
+    show_batch_progress(job, total)
+    st.text(f"🔄 Processed {job.counts()['done']}/{total} in {job.elapsed:.1f}s")
+    # The job thread creates the CSV; the first poll can get here before it does
+    if os.path.exists(job.csv_path):
+        st.download_button(
+            label="⬇️ Download Partial Results (CSV)",
+            data=job.read_export(job.csv_path),
+            file_name="enriched_emails_partial.csv",
+            mime="text/csv"
+        )
+
 # -----------------------------
 # Tabs: Single vs Batch
 # -----------------------------
@@ -70,30 +105,36 @@ with tab1:
         if not clean_email:
             st.warning("⚠️ Please enter a valid email address.")
             logging.warning("Empty email input.")
+            st.session_state.pop("single_result", None)
         else:
             logging.info(f"Starting enrichment for {clean_email}")
             with st.spinner(f"🔍 Enriching `{clean_email}`..."):
-                result = engine.enrich_email(clean_email)
-            
-            if "error" in result:
-                st.error(result["error"])
+                # Kept in session state so later reruns (e.g. a finished batch) still show it
+                st.session_state["single_result"] = (clean_email, engine.enrich_email(clean_email))
+
+    if "single_result" in st.session_state:
+        clean_email, result = st.session_state["single_result"]
+        if "error" in result:
+            st.error(result["error"])
+            if submitted:
                 logging.error(f"Error enriching {clean_email}: {result['error']}")
-            else:
-                st.success("✅ Enrichment Complete!")
-               
-                st.dataframe(pd.DataFrame([result]), use_container_width=True, height=100)
-                
-                # Prepare Excel download
-                output = BytesIO()
-                pd.DataFrame([result]).to_excel(output, index=False, engine='openpyxl')
-                output.seek(0)
-                download_name = f"enriched_{clean_email.replace('@','_').replace('.','_')}.xlsx"
-                st.download_button(
-                    label="⬇️ Download Enriched Result (Excel)",
-                    data=output,
-                    file_name=download_name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+        else:
+            st.success("✅ Enrichment Complete!")
+           
+            st.dataframe(pd.DataFrame([result]), use_container_width=True, height=100)
+            
+            # Prepare Excel download
+            output = BytesIO()
+            pd.DataFrame([result]).to_excel(output, index=False, engine='openpyxl')
+            output.seek(0)
+            download_name = f"enriched_{clean_email.replace('@','_').replace('.','_')}.xlsx"
+            st.download_button(
+                label="⬇️ Download Enriched Result (Excel)",
+                data=output,
+                file_name=download_name,
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            if submitted:
                 logging.info(f"Excel file prepared for {clean_email}.")
 
 # ====================================================
@@ -105,12 +146,10 @@ with tab2:
     uploaded_file = st.file_uploader("Choose a CSV or Excel file", type=["csv", "xlsx"])
     
     if uploaded_file:
+        data = uploaded_file.getvalue()
+        upload_id = file_hash(data)
         try:
-            if uploaded_file.name.endswith(".xlsx"):
-                df = pd.read_excel(uploaded_file)
-            else:
-                df = pd.read_csv(uploaded_file)
-            logging.info(f"File read successfully: {uploaded_file.name}")
+            df = read_upload(upload_id, uploaded_file.name, data)
         except Exception as e:
             st.error(f"❌ Failed to read file: {e}")
             logging.error(f"Failed to read uploaded file {uploaded_file.name}: {e}")
@@ -124,48 +163,34 @@ with tab2:
             if total == 0:
                 st.warning("The 'Email' column is empty.")
             else:
-                st.info(f"📬 Found **{total}** emails. Enrichment will start below.")
-
-                # Progress and metrics
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                results = []
-                start_time = time.time()
-
-                for idx, email in enumerate(emails):
-                    try:
-                        res = engine.enrich_email(email)
-                    except Exception as e:
-                        res = {"email": email, "error": str(e)}
-                    results.append(res)
-                    
-                    progress_bar.progress((idx + 1) / total)
-                    status_text.text(f"🔄 Processing {idx + 1}/{total}: {email}")
-                
-                end_time = time.time()
-                elapsed = end_time - start_time
-
-                st.success(f"✅ Batch Enrichment Complete in {elapsed:.1f} seconds!")
+                st.info(f"📬 Found **{total}** emails. Enrichment runs in the background and results appear below.")
 
-                results_df = pd.DataFrame(results)
-                with st.expander("See Full Results"):
-                    st.dataframe(results_df, use_container_width=True, height=400)
+                # Same file → same job, even after clicking a download button
+                attempts = st.session_state.setdefault("batch_attempts", {})
+                job = get_batch_job(upload_id, tuple(emails), attempts.get(upload_id, 0))
 
-                # Summary metrics
-                success_count = sum(1 for r in results if "error" not in r)
-                fail_count = total - success_count
-                col1, col2 = st.columns(2)
-                col1.metric("✅ Success", success_count)
-                col2.metric("❌ Failed", fail_count)
+                if not job.finished:
+                    poll_batch_job(job, total)
+                else:
+                    show_batch_progress(job, total)
 
-                # Download Excel
-                output = BytesIO()
-                results_df.to_excel(output, index=False, engine='openpyxl')
-                output.seek(0)
-                st.download_button(
-                    label="⬇️ Download Enriched Results (Excel)",
-                    data=output,
-                    file_name="enriched_emails.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-                logging.info("Batch Excel file prepared for download.")
+                    if job.error:
+                        st.error(f"❌ Batch stopped: {job.error}")
+                        logging.error(f"Batch job {upload_id[:12]} failed: {job.error}")
+                        if st.button("🔁 Retry batch"):
+                            attempts[upload_id] = attempts.get(upload_id, 0) + 1
+                            st.rerun()
+                    else:
+                        st.success(f"✅ Batch Enrichment Complete in {job.elapsed:.1f} seconds!")
+                        st.download_button(
+                            label="⬇️ Download Enriched Results (Excel)",
+                            data=job.read_export(job.xlsx_path),
+                            file_name="enriched_emails.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+                        st.download_button(
+                            label="⬇️ Download Enriched Results (CSV)",
+                            data=job.read_export(job.csv_path),
+                            file_name="enriched_emails.csv",
+                            mime="text/csv"
+                        )
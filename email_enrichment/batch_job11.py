@@ -0,0 +1,132 @@
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from openpyxl import Workbook
+
+from result_columns14 import ResultColumns
+
+logger = logging.getLogger(__name__)
+
+
+# Flat export layout: nested `confidence` becomes three columns
+RESULT_COLUMNS = [
+    "email", "email_domain", "domain_type", "likely_person",
+    "related_university", "university_domain", "related_company",
+    "company_domain", "sector",
+    "confidence_domain", "confidence_university", "confidence_company",
+    "error"
+]
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def flatten_result(result: Dict) -> Dict:
+    """Turn an `enrich_email` result into one flat export row."""
+    row = {k: v for k, v in result.items() if k != "confidence"}
+    for key, value in (result.get("confidence") or {}).items():
+        row[f"confidence_{key}"] = value
+    return row
+
+
+class BatchJob:
+    """
+    Enriches an uploaded email list on a background thread.
+
+    Results land in a columnar ResultColumns store as they complete and are streamed
+    to a CSV file and a write-only XLSX workbook, so the UI can show
+    partial results and offer downloads without re-running anything.
+
+    Several jobs, the single-email tab and the cache warmer share one
+    engine without a global lock. Its caches are plain dicts updated one
+    key at a time, page fetches are serialized per domain, and cache
+    files are written atomically.
+    """
+
+    def __init__(self, engine, emails: List[str], job_id: str, output_dir: str = "output"):
+        self.engine = engine
+        self.emails = list(emails)
+        self.job_id = job_id
+        self.total = len(self.emails)
+        self.results = ResultColumns(capacity=self.total)
+        self.done = 0
+        self.failed = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.csv_path = os.path.join(output_dir, f"enriched_{job_id[:12]}.csv")
+        self.xlsx_path = os.path.join(output_dir, f"enriched_{job_id[:12]}.xlsx")
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self) -> "BatchJob":
+        if self._thread is None:
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name=f"batch-{self.job_id[:8]}", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _run(self):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Enriched")
+        sheet.append(RESULT_COLUMNS)
+        try:
+            with self.engine.profiler(f"batch_job-{self.job_id[:12]}"), \
+                    open(self.csv_path, "w", newline="", encoding="utf-8") as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=RESULT_COLUMNS, extrasaction="ignore")
+                writer.writeheader()
+                # Every yielded row is appended to self.results, so duplicates are rebuilt from there
+                for _, result in self.engine.iter_enrich_batch(self.emails, rows=self.results):
+                    row = flatten_result(result)
+                    writer.writerow(row)
+                    csv_file.flush()
+                    sheet.append([row.get(col) for col in RESULT_COLUMNS])
+                    # Rows arrive in input order, so appending keeps them aligned
+                    with self._lock:
+                        self.results.append(result)
+                        self.done += 1
+                        self.failed += "error" in result
+            workbook.save(self.xlsx_path)
+        except Exception as e:
+            logger.exception("Batch job %s failed", self.job_id[:12])
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.finished_at = time.time()
+
+    # -------------------------
+    # Views for the UI
+    # -------------------------
+    def snapshot(self):
+        """Completed results so far, in input order, as a DataFrame."""
+        with self._lock:
+            return self.results.to_pandas()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {"done": self.done, "success": self.done - self.failed, "failed": self.failed}
+
+    def read_export(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
@@ -0,0 +1,300 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from company_finder4 import CompanyFinder
+from domain_scraper6 import DomainScraper
+from domain_type_detector7 import DomainTypeDetectorFastText
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "cache_snapshot.eecs"
+MAGIC = b"EECS"
+VERSION = 1
+MERGE_POLICIES = ("newest", "confidence")
+
+# File layout: header, section table, then one (optionally zlib'd) body per section.
+# A body is a run of entries sorted by key: ENTRY header, key bytes, JSON value bytes.
+HEADER = struct.Struct("<4sHHdI")     # magic, version, reserved, created_at, section count
+SECTION = struct.Struct("<16sQQQI?")  # name, offset, stored length, raw length, entries, compressed
+ENTRY = struct.Struct("<dhHI")        # timestamp, confidence rank, key length, value length
+
+CONFIDENCE_RANK = {"Low": 1, "Medium": 2, "High": 3}
+
+Sections = Dict[str, Dict[str, "SnapshotEntry"]]
+
+
+class SnapshotEntry(NamedTuple):
+    timestamp: float
+    rank: int
+    value: Any
+
+
+class CacheSpec(NamedTuple):
+    """Where one engine cache lives and how two of its entries compare."""
+    name: str
+    component: str                  # Components name that owns the cache
+    attribute: str                  # dict attribute on that component
+    cache_file: Optional[str]       # JSON file it persists to, if any
+    timestamp: Callable[[Any], Optional[float]]
+    rank: Callable[[Any], int]
+
+
+def _university_rank(value) -> int:
+    name, confidence = value[:2]
+    return CONFIDENCE_RANK.get(confidence, 0) if name else 0
+
+
+def _sector(value) -> str:
+    # Sector entries used to be bare strings
+    return value["sector"] if isinstance(value, dict) else value
+
+
+# Entries without a timestamp of their own (older cache files) count as timestamp 0:
+# any timestamped entry is newer
+CACHE_SPECS: Tuple[CacheSpec, ...] = (
+    CacheSpec("domain_info", "scraper", "page_cache", DomainScraper.CACHE_FILE,
+              lambda e: e.get("fetched_at"), lambda e: 1 if e["info"].get("scraped") else 0),
+    CacheSpec("domain_type", "detector", "domain_cache", DomainTypeDetectorFastText.CACHE_FILE,
+              lambda e: e.get("updated_at"), lambda e: int(round(e["confidence"] * 100))),
+    CacheSpec("university", "company_finder", "university_cache", CompanyFinder.CACHE_FILE,
+              lambda e: e[2] if len(e) > 2 else None, _university_rank),
+    CacheSpec("sector", "sector_extractor", "sector_cache", None,
+              lambda e: e.get("updated_at") if isinstance(e, dict) else None,
+              lambda e: 0 if _sector(e) == "Unknown" else 1),
+    CacheSpec("names", "name_extractor", "domain_names", None,
+              lambda e: e.get("fetched_at"), lambda e: 1 if e.get("name") else 0),
+)
+
+
+# -------------------------
+# Collecting and merging
+# -------------------------
+def collect(components=None, pending: Optional[Sections] = None) -> Sections:
+    """
+    Gather every engine cache as snapshot entries. Built components are
+    read live; the others fall back to their JSON cache file, so this
+    also works without an engine (in-memory caches are then empty).
+    `pending` holds loaded snapshot sections not yet seeded into an
+    unbuilt component; they are carried over instead of being dropped.
+    """
+    sections: Sections = {}
+    for spec in CACHE_SPECS:
+        built = components is not None and components.is_built(spec.component)
+        if built:
+            cache = dict(getattr(components.get(spec.component), spec.attribute))
+        elif spec.cache_file and os.path.exists(spec.cache_file):
+            with open(spec.cache_file, "r") as f:
+                cache = json.load(f)
+        else:
+            cache = {}
+        sections[spec.name] = {
+            key: SnapshotEntry(spec.timestamp(value) or 0.0, spec.rank(value), value)
+            for key, value in cache.items()
+        }
+        if not built and pending and pending.get(spec.name):
+            sections.update(merge_sections({spec.name: pending[spec.name]}, {spec.name: sections[spec.name]}))
+    return sections
+
+
+def wins(new: SnapshotEntry, old: SnapshotEntry, policy: str = "newest") -> bool:
+    """`newest`: later timestamp wins. `confidence`: higher rank wins, then the later one."""
+    if policy == "confidence" and new.rank != old.rank:
+        return new.rank > old.rank
+    return new.timestamp > old.timestamp
+
+
+def merge_sections(base: Sections, other: Sections, policy: str = "newest") -> Sections:
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy '{policy}', expected one of {MERGE_POLICIES}")
+    merged = {name: dict(entries) for name, entries in base.items()}
+    for name, entries in other.items():
+        target = merged.setdefault(name, {})
+        for key, entry in entries.items():
+            current = target.get(key)
+            if current is None or wins(entry, current, policy):
+                target[key] = entry
+    return merged
+
+
+# -------------------------
+# Binary format
+# -------------------------
+def write_snapshot(path: str, sections: Sections, created_at: Optional[float] = None) -> int:
+    """Write `sections` to `path` atomically. Returns the number of entries written."""
+    bodies = []
+    for name, entries in sections.items():
+        parts = []
+        for key in sorted(entries):
+            entry = entries[key]
+            key_bytes = key.encode("utf-8")
+            value_bytes = json.dumps(entry.value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            parts.append(ENTRY.pack(entry.timestamp, entry.rank, len(key_bytes), len(value_bytes)))
+            parts.append(key_bytes)
+            parts.append(value_bytes)
+        raw = b"".join(parts)
+        packed = zlib.compress(raw, 6)
+        # Tiny sections are stored raw and read straight from the mapping
+        compressed = len(packed) < len(raw)
+        bodies.append((name, packed if compressed else raw, len(raw), len(entries), compressed))
+
+    offset = HEADER.size + SECTION.size * len(bodies)
+    table = []
+    for name, body, raw_length, count, compressed in bodies:
+        table.append(SECTION.pack(name.encode("ascii"), offset, len(body), raw_length, count, compressed))
+        offset += len(body)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, created_at or time.time(), len(bodies)))
+        f.writelines(table)
+        for body in bodies:
+            f.write(body[1])
+    os.replace(tmp_path, path)
+    return sum(body[3] for body in bodies)
+
+
+def _read_table(view) -> Tuple[float, List[Tuple]]:
+    if len(view) < HEADER.size:
+        raise ValueError("Not a cache snapshot (file too short)")
+    magic, version, _, created_at, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a cache snapshot (bad magic)")
+    if version > VERSION:
+        raise ValueError(f"Cache snapshot version {version} is newer than supported ({VERSION})")
+    table = []
+    for i in range(count):
+        name, offset, length, raw_length, entries, compressed = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+        table.append((name.rstrip(b"\0").decode("ascii"), offset, length, raw_length, entries, compressed))
+    return created_at, table
+
+
+def _decode_entries(body, count: int) -> Dict[str, SnapshotEntry]:
+    entries: Dict[str, SnapshotEntry] = {}
+    pos = 0
+    for _ in range(count):
+        timestamp, rank, key_length, value_length = ENTRY.unpack_from(body, pos)
+        pos += ENTRY.size
+        key = str(body[pos:pos + key_length], "utf-8")
+        pos += key_length
+        value = json.loads(str(body[pos:pos + value_length], "utf-8"))
+        pos += value_length
+        entries[key] = SnapshotEntry(timestamp, rank, value)
+    return entries
+
+
+def read_snapshot(path: str, names: Optional[Sequence[str]] = None) -> Tuple[float, Sections]:
+    """Load a snapshot (optionally only some sections) through a read-only memory map."""
+    sections: Sections = {}
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Not a cache snapshot (empty file)")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            created_at, table = _read_table(view)
+            for name, offset, length, raw_length, count, compressed in table:
+                if names is not None and name not in names:
+                    continue
+                error = None
+                body = view[offset:offset + length]
+                try:
+                    # Raw sections decode straight from the mapping, without a copy
+                    data = zlib.decompress(body, bufsize=raw_length) if compressed else body
+                    sections[name] = _decode_entries(data, count)
+                except (struct.error, zlib.error, ValueError) as e:
+                    error = f"Corrupt cache snapshot section '{name}': {e}"
+                finally:
+                    # The mapping cannot close while slices of it are alive
+                    data = None
+                    body.release()
+                if error:
+                    raise ValueError(error)
+    return created_at, sections
+
+
+def snapshot_info(path: str) -> Dict:
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        count = HEADER.unpack(head)[4] if len(head) == HEADER.size else 0
+        created_at, table = _read_table(head + f.read(SECTION.size * count))
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created_at)),
+        "sections": {name: {"entries": n, "bytes": length, "compressed": c} for name, _, length, _, n, c in table},
+    }
+
+
+# -------------------------
+# Seeding an engine
+# -------------------------
+def _seed(component, spec: CacheSpec, entries: Dict[str, SnapshotEntry], policy: str) -> None:
+    cache = getattr(component, spec.attribute)
+    if not cache:
+        cache.update((key, entry.value) for key, entry in entries.items())
+        seeded = len(entries)
+    else:
+        seeded = 0
+        for key, entry in entries.items():
+            local = cache.get(key)
+            if local is None or wins(entry, SnapshotEntry(spec.timestamp(local) or 0.0, spec.rank(local), local), policy):
+                cache[key] = entry.value
+                seeded += 1
+    logger.info("Seeded %d %s entries from cache snapshot", seeded, spec.name)
+
+
+def apply_snapshot(components, sections: Sections, policy: str = "newest") -> Dict[str, int]:
+    """
+    Merge snapshot sections into the engine caches. Components that are
+    not built yet are seeded right after they are, so loading a snapshot
+    at startup does not force GloVe or spaCy to load.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"Unknown merge policy '{policy}', expected one of {MERGE_POLICIES}")
+    scheduled = {}
+    for spec in CACHE_SPECS:
+        entries = sections.get(spec.name)
+        if not entries:
+            continue
+        components.when_built(spec.component, lambda c, s=spec, e=entries: _seed(c, s, e, policy))
+        scheduled[spec.name] = len(entries)
+    unknown = set(sections) - {spec.name for spec in CACHE_SPECS}
+    if unknown:
+        logger.warning("Ignoring unknown cache snapshot sections: %s", sorted(unknown))
+    return scheduled
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export, merge and inspect engine cache snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Snapshot the JSON cache files in the working directory")
+    p_export.add_argument("output", nargs="?", default=SNAPSHOT_FILE)
+
+    p_merge = sub.add_parser("merge", help="Combine snapshots from several workers")
+    p_merge.add_argument("output")
+    p_merge.add_argument("inputs", nargs="+")
+    p_merge.add_argument("--policy", choices=MERGE_POLICIES, default="newest")
+
+    p_info = sub.add_parser("info", help="Show snapshot sections")
+    p_info.add_argument("path")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        count = write_snapshot(args.output, collect())
+        print(f"Wrote {count} entries to {args.output}")
+    elif args.command == "merge":
+        merged: Sections = {}
+        for path in args.inputs:
+            merged = merge_sections(merged, read_snapshot(path)[1], args.policy)
+        count = write_snapshot(args.output, merged)
+        print(f"Merged {len(args.inputs)} snapshots into {args.output} ({count} entries)")
+    else:
+        print(json.dumps(snapshot_info(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
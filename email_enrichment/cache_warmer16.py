@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from domain_key10 import get_domain_key
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Keeps hot domains warm so interactive lookups rarely scrape on the
+    request path.
+
+    The engine reports every domain it enriches (only the busiest
+    `max_tracked` counts are kept, halved on each prune); a background
+    thread periodically takes the `top_n` most requested domains (plus any
+    listed in a warm-up file) and refreshes their scraped pages shortly
+    before they go stale. When a page's extracted fields changed, the
+    derived university and domain-type entries are recomputed too.
+    Work runs one domain at a time with a pause in between, so it stays
+    in the background behind user requests.
+    """
+
+    def __init__(
+        self,
+        engine,
+        top_n: int = 100,
+        warmup_file: Optional[str] = None,
+        interval: float = 300,
+        refresh_margin: float = 0.2,
+        pause: float = 1.0,
+        max_tracked: Optional[int] = None
+    ):
+        self.engine = engine
+        self.top_n = top_n
+        self.warmup_file = warmup_file
+        self.interval = interval
+        self.refresh_margin = refresh_margin
+        self.pause = pause
+        # Domains whose request counts are kept; the long tail is dropped
+        self.max_tracked = max_tracked or top_n * 10
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Access tracking
+    # -------------------------
+    def record(self, domain: str) -> None:
+        with self._lock:
+            self.counts[domain] += 1
+            if len(self.counts) > 2 * self.max_tracked:
+                self._prune()
+
+    def _prune(self) -> None:
+        # Keep the busiest domains at half weight, so recent traffic can overtake old hot spots
+        top = self.counts.most_common(self.max_tracked)
+        self.counts = Counter({domain: count // 2 for domain, count in top if count > 1})
+
+    def hot_domains(self) -> List[str]:
+        with self._lock:
+            return [domain for domain, _ in self.counts.most_common(self.top_n)]
+
+    def warmup_domains(self) -> List[str]:
+        if not self.warmup_file or not os.path.exists(self.warmup_file):
+            return []
+        with open(self.warmup_file, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    # -------------------------
+    # Refreshing
+    # -------------------------
+    def needs_refresh(self, domain: str) -> bool:
+        scraper = self.engine.components.get("scraper")
+        entry = scraper.page_cache.get(domain)
+        if entry is None:
+            return True
+        return time.time() - entry.get("fetched_at", 0) > scraper.entry_ttl(entry) * (1 - self.refresh_margin)
+
+    def warm(self, domain: str) -> bool:
+        """Refresh one domain if it is cold or about to expire. Returns True if work was done."""
+        key = get_domain_key(domain)
+        if key.is_free_email or key.university:
+            return False  # answered offline by the knowledge base
+        domain = key.registrable
+        if not self.needs_refresh(domain):
+            return False
+        if self.engine.components.get("scraper").unreachable_info(domain) is not None:
+            return False  # pre-flight found it dead; nothing to refresh
+
+        # Same shared instances the pipeline stages use; refresh takes the
+        # scraper's per-domain fetch lock, so it never races a stage's fetch
+        finder = self.engine.components.get("company_finder")
+        detector = self.engine.components.get("detector")
+        _, changed = finder.scraper.refresh(domain)
+        if changed:
+            # Derived entries were computed from the old page
+            finder.university_cache.pop(domain, None)
+            detector.domain_cache.pop(domain, None)
+        finder.find_related_university(key)
+        detector.identify_domain_type(key)
+        return True
+
+    def run_once(self, domains: Optional[Iterable[str]] = None) -> int:
+        """Warm the given domains (default: warm-up file + hot domains). Returns domains refreshed."""
+        if domains is None:
+            domains = list(dict.fromkeys(self.warmup_domains() + self.hot_domains()))
+        refreshed = 0
+        for domain in domains:
+            if self._stop.is_set():
+                break
+            try:
+                if self.warm(domain):
+                    refreshed += 1
+                    self._stop.wait(self.pause)
+            except Exception:
+                logger.warning("Cache warm-up failed for %s", domain, exc_info=True)
+                continue
+        if refreshed:
+            logger.info("Cache warmer refreshed %d domains", refreshed)
+        return refreshed
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self) -> "CacheWarmer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
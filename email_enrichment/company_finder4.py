@@ -1,31 +1,28 @@
-from typing import Dict, Optional, Tuple
-import tldextract
+from typing import Dict, Optional, Tuple, Union
 import re
 import json
 import os
+import threading
+import time
 
-from domain_scraper6 import DomainScraper
+from domain_scraper6 import DomainScraper, get_domain_scraper
 from domain_type_detector7 import DomainTypeDetectorFastText
+from domain_knowledge9 import get_knowledge_base
+from domain_key10 import DomainKey, as_domain_key
+from json_store21 import save_json
 
 
 class CompanyFinder:
     CACHE_FILE = "university_cache.json"
 
-    def __init__(self):
-        self.scraper = DomainScraper()
-        self.detector = DomainTypeDetectorFastText(self.scraper)
-
-        # Free email domains
-        self.free_email_domains: Dict[str, str] = {
-            "gmail.com": "Free webmail (Google)",
-            "yahoo.com": "Free webmail (Yahoo)",
-            "outlook.com": "Free webmail (Microsoft)",
-            "hotmail.com": "Free webmail (Microsoft)",
-            "aol.com": "Free webmail (AOL)",
-            "mail.com": "Free webmail",
-            "protonmail.com": "Free webmail (ProtonMail)",
-            "icloud.com": "Free webmail (Apple)"
-        }
+    def __init__(self, scraper: Optional[DomainScraper] = None):
+        # The engine passes its shared scraper; the detector (GloVe) is built on first use
+        self.scraper = scraper or get_domain_scraper()
+        self._detector: Optional[DomainTypeDetectorFastText] = None
+        self._detector_lock = threading.Lock()
+
+        # Offline webmail / disposable / university knowledge base
+        self.knowledge_base = get_knowledge_base()
 
         # University keywords for fallback rules
         self.university_keywords = [
@@ -33,79 +30,74 @@ class CompanyFinder:
             "edu", "ac.in", "ac.uk", "ac.id", "ac.jp", "ac.nz", ".edu"
         ]
 
-        # Known university domains
-        self.university_domains = self.load_university_domains()
-
-        # Load scraped university cache
-        self.university_cache: Dict[str, Tuple[str, str]] = self.load_cache()
-
-    # -------------------------
-    # University domain list
-    # -------------------------
-    def load_university_domains(self) -> Dict[str, str]:
-        return {
-            "iitjammu.ac.in": "Indian Institute of Technology Jammu (IIT Jammu)",
-            "iitd.ac.in": "Indian Institute of Technology Delhi (IIT Delhi)",
-            "iitb.ac.in": "Indian Institute of Technology Bombay (IIT Bombay)",
-            "iitkgp.ac.in": "Indian Institute of Technology Kharagpur (IIT Kharagpur)",
-            "iitm.ac.in": "Indian Institute of Technology Madras (IIT Madras)",
-            "iitk.ac.in": "Indian Institute of Technology Kanpur (IIT Kanpur)",
-            "iitg.ac.in": "Indian Institute of Technology Guwahati (IIT Guwahati)",
-            "iitr.ac.in": "Indian Institute of Technology Roorkee (IIT Roorkee)",
-            "iitbhu.ac.in": "Indian Institute of Technology Varanasi (IIT BHU)",
-            "berkeley.edu": "University of California, Berkeley",
-            "mit.edu": "Massachusetts Institute of Technology",
-            "stanford.edu": "Stanford University",
-            "harvard.edu": "Harvard University",
-            "oxford.ac.uk": "University of Oxford",
-            "cam.ac.uk": "University of Cambridge"
-        }
+        # Load scraped university cache: domain -> (name, confidence, updated_at)
+        self.university_cache: Dict[str, Tuple[Optional[str], str, float]] = self.load_cache()
 
     # -------------------------
     # Domain type detection
     # -------------------------
-    def identify_domain_type(self, domain: str) -> str:
+    @property
+    def detector(self) -> DomainTypeDetectorFastText:
+        if self._detector is None:
+            # Stages and the cache warmer ask concurrently; GloVe must load only once
+            with self._detector_lock:
+                if self._detector is None:
+                    self._detector = DomainTypeDetectorFastText(self.scraper)
+        return self._detector
+
+    def identify_domain_type(self, domain: Union[str, DomainKey]) -> str:
         domain_type, _ = self.detector.identify_domain_type(domain)
         return domain_type
 
-    def get_domain_type_label(self, domain: str) -> str:
+    def get_domain_type_label(self, domain: Union[str, DomainKey]) -> str:
         return self.detector.get_domain_type_label(domain)
 
     # -------------------------
     # University & Company Matching
     # -------------------------
     def find_related_university(
-        self, domain: str, person_name: Optional[str] = None
+        self, domain: Union[str, DomainKey], person_name: Optional[str] = None, scrape: bool = True
     ) -> Tuple[Optional[str], Optional[str], str]:
-        domain_lower = domain.lower()
+        key = as_domain_key(domain)
+        domain_lower = key.registrable
 
-        # ✅ 1️⃣ Check cached results first
-        if domain_lower in self.university_cache:
-            uni_name, confidence = self.university_cache[domain_lower]
-            return uni_name, domain_lower, confidence
+        # ✅ 1️⃣ Offline knowledge base (matches subdomains too, no cache write needed)
+        known = self.knowledge_base.university(key.domain)
+        if known:
+            uni_name, uni_domain = known
+            return uni_name, uni_domain, "High"
 
-        # ✅ 2️⃣ Check known university domains
-        for uni_domain, uni_name in self.university_domains.items():
-            if domain_lower == uni_domain.lower():
-                self.university_cache[domain_lower] = (uni_name, "High")
-                self.save_cache()
-                return uni_name, domain_lower, "High"
+        # Free webmail and disposable providers are never universities
+        if key.is_free_email:
+            return None, None, "Low"
+
+        # ✅ 2️⃣ Check cached results (keyed on the registrable domain)
+        if domain_lower in self.university_cache:
+            # Entries written before updated_at was recorded have two fields
+            uni_name, confidence = self.university_cache[domain_lower][:2]
+            # A cached negative has no university domain either
+            return uni_name, domain_lower if uni_name else None, confidence
 
         # 🧰 3️⃣ Domain suffix rules
-        if ".ac." in domain_lower or ".edu" in domain_lower:
-            self.university_cache[domain_lower] = (f"University ({domain})", "Medium")
-            self.save_cache()
-            return f"University ({domain})", domain_lower, "Medium"
+        if key.academic_suffix or ".edu" in domain_lower:
+            self.remember_university(domain_lower, f"University ({domain_lower})", "Medium")
+            return f"University ({domain_lower})", domain_lower, "Medium"
 
         # 📝 4️⃣ Keyword fallback
         if any(keyword in domain_lower for keyword in self.university_keywords):
-            self.university_cache[domain_lower] = (f"University ({domain})", "Low")
-            self.save_cache()
-            return f"University ({domain})", domain_lower, "Low"
+            self.remember_university(domain_lower, f"University ({domain_lower})", "Low")
+            return f"University ({domain_lower})", domain_lower, "Low"
+
+        # Offline callers stop here without caching a negative they never checked
+        if not scrape:
+            return None, None, "Low"
 
         # 🌐 5️⃣ Scrape homepage for additional signals
         try:
-            info = self.scraper.get_domain_info(domain)
+            info = self.scraper.get_domain_info(domain_lower)
+            if info.get("unreachable"):
+                # Pre-flight could not resolve it; don't remember a negative that may not hold
+                return None, None, "Low"
             html = info.get("html", "")
             title = info.get("title", "") or ""
             description = info.get("meta_description", "") or ""
@@ -120,66 +112,67 @@ class CompanyFinder:
             if any(kw in combined_text for kw in edu_keywords):
                 # Regex for "University of XYZ"
                 if re.search(r"university\s+of\s+[A-Z][a-z]+", html, re.IGNORECASE):
-                    self.university_cache[domain_lower] = (f"University ({domain})", "High")
-                    self.save_cache()
-                    return f"University ({domain})", domain_lower, "High"
+                    self.remember_university(domain_lower, f"University ({domain_lower})", "High")
+                    return f"University ({domain_lower})", domain_lower, "High"
 
                 # JSON-LD structured data check
                 if '"@type":"CollegeOrUniversity"' in html.replace(" ", ""):
-                    self.university_cache[domain_lower] = (f"University ({domain})", "High")
-                    self.save_cache()
-                    return f"University ({domain})", domain_lower, "High"
+                    self.remember_university(domain_lower, f"University ({domain_lower})", "High")
+                    return f"University ({domain_lower})", domain_lower, "High"
 
                 # Weak signals
-                self.university_cache[domain_lower] = (f"University ({domain})", "Medium")
-                self.save_cache()
-                return f"University ({domain})", domain_lower, "Medium"
+                self.remember_university(domain_lower, f"University ({domain_lower})", "Medium")
+                return f"University ({domain_lower})", domain_lower, "Medium"
 
         except Exception:
             # Scraper failed → fallback only
             pass
 
         # 6️⃣ Not a university
-        self.university_cache[domain_lower] = (None, "Low")
-        self.save_cache()
+        self.remember_university(domain_lower, None, "Low")
         return None, None, "Low"
 
     def find_related_company(
-        self, email_domain: str, person_name: Optional[str] = None
+        self, email_domain: Union[str, DomainKey], person_name: Optional[str] = None, scrape: bool = True
     ) -> Tuple[Optional[str], Optional[str], str, Optional[str]]:
+        key = as_domain_key(email_domain)
+
         # 1️⃣ Free webmail check
-        if email_domain in self.free_email_domains:
+        if key.is_free_email:
             return None, None, "Low", None
 
-        # 2️⃣ Obvious university keywords
-        if any(keyword in email_domain.lower() for keyword in ["edu", ".ac", "university"]):
+        # 2️⃣ Known universities and academic suffixes ("edu", "ac.uk", ...)
+        if key.university or key.academic_suffix:
             return None, None, "Low", None
 
-        # 3️⃣ Extract clean company domain using tldextract
-        ext = tldextract.extract(email_domain)
-        company_domain = ext.domain or email_domain
+        # 3️⃣ Company domain is the registrable domain ("centrin.net.id", not "net.id")
+        company_domain = key.registrable
 
         # 4️⃣ Try scraping info
-        domain_info = self.scraper.get_domain_info(email_domain)
+        domain_info = self.scraper.get_domain_info(company_domain) if scrape else {}
         if domain_info.get("scraped"):
-            company_name = domain_info.get("company_name") or company_domain.title()
+            company_name = domain_info.get("company_name") or key.name.title()
             sector = domain_info.get("sector")
             confidence = "High" if domain_info.get("company_name") else "Medium"
 
             # Lower confidence for deep subdomains
-            if email_domain.count(".") > 2:
+            if key.domain.count(".") > 2:
                 confidence = "Low"
 
-            return company_name, email_domain, confidence, sector
+            return company_name, company_domain, confidence, sector
 
         # 5️⃣ Fallback: simple title case
-        company_name = company_domain.replace("-", " ").title()
-        return company_name, email_domain, "Medium", None
+        company_name = key.name.replace("-", " ").title()
+        return company_name, company_domain, "Medium", None
 
     # -------------------------
     # Cache handling
     # -------------------------
-    def load_cache(self) -> Dict[str, Tuple[str, str]]:
+    def remember_university(self, domain: str, name: Optional[str], confidence: str):
+        self.university_cache[domain] = (name, confidence, time.time())
+        self.save_cache()
+
+    def load_cache(self) -> Dict[str, Tuple[Optional[str], str, float]]:
         if os.path.exists(self.CACHE_FILE):
             try:
                 with open(self.CACHE_FILE, "r") as f:
@@ -189,5 +182,4 @@ class CompanyFinder:
         return {}
 
     def save_cache(self):
-        with open(self.CACHE_FILE, "w") as f:
-            json.dump(self.university_cache, f, indent=2)
+        save_json(self.CACHE_FILE, self.university_cache)
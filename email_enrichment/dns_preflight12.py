@@ -0,0 +1,160 @@
+import contextlib
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class DnsRecord(NamedTuple):
+    domain: str
+    a: List[str]
+    aaaa: List[str]
+    definitive: bool = True     # False for temporary failures (timeouts, SERVFAIL)
+
+    @property
+    def resolvable(self) -> bool:
+        return bool(self.a or self.aaaa)
+
+
+# -------------------------
+# Resolvers
+# -------------------------
+class Resolver(ABC):
+    """Pluggable resolver interface: return a DnsRecord for one domain."""
+
+    @abstractmethod
+    def resolve(self, domain: str) -> DnsRecord:
+        ...
+
+
+class SystemResolver(Resolver):
+    """A/AAAA through the OS resolver; a domain without addresses cannot be scraped."""
+
+    def resolve(self, domain: str) -> DnsRecord:
+        a, aaaa = [], []
+        definitive = True
+        try:
+            for family, _, _, _, sockaddr in socket.getaddrinfo(domain, None, proto=socket.IPPROTO_TCP):
+                if family == socket.AF_INET:
+                    a.append(sockaddr[0])
+                elif family == socket.AF_INET6:
+                    aaaa.append(sockaddr[0])
+        except socket.gaierror as e:
+            # Only "name does not exist" answers mark a domain dead
+            definitive = e.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME))
+        except UnicodeError:
+            pass
+        except OSError:
+            definitive = False
+        return DnsRecord(domain, sorted(set(a)), sorted(set(aaaa)), definitive)
+
+
+class StubResolver(Resolver):
+    """In-memory resolver for tests: {domain: ["1.2.3.4", ...]}; unknown domains fail."""
+
+    def __init__(self, records: Dict[str, List[str]]):
+        self.records = records
+
+    def resolve(self, domain: str) -> DnsRecord:
+        addresses = self.records.get(domain, [])
+        return DnsRecord(
+            domain,
+            [ip for ip in addresses if ":" not in ip],
+            [ip for ip in addresses if ":" in ip]
+        )
+
+
+# -------------------------
+# Pre-flight stage
+# -------------------------
+class DnsPreflight:
+    """
+    Resolves every unique domain of a batch up front, concurrently, so
+    domains that do not resolve skip scraping and search fallbacks and go
+    straight to offline heuristics.
+
+    The LRU only bounds what is remembered between batches. Inside
+    `batch()`, the dead domains it found stay pinned until the batch ends,
+    so a batch with more unique domains than `cache_size` still skips
+    every one of them.
+    """
+
+    def __init__(
+        self,
+        resolver: Optional[Resolver] = None,
+        max_workers: int = 32,
+        cache_size: int = 10_000,
+        ttl: float = 3600
+    ):
+        self.resolver = resolver or SystemResolver()
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Unresolvable domains of running batches -> number of batches holding them
+        self._pinned: Counter = Counter()
+
+    def _cached(self, domain: str) -> Optional[DnsRecord]:
+        with self._lock:
+            hit = self._cache.get(domain)
+            if hit is None:
+                return None
+            record, expires = hit
+            if expires < time.time():
+                del self._cache[domain]
+                return None
+            self._cache.move_to_end(domain)
+            return record
+
+    def _store(self, record: DnsRecord):
+        with self._lock:
+            self._cache[record.domain] = (record, time.time() + self.ttl)
+            self._cache.move_to_end(record.domain)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def check(self, domains: Iterable[str]) -> Dict[str, DnsRecord]:
+        """Resolve all domains (cached ones are free) and return their records."""
+        results: Dict[str, DnsRecord] = {}
+        missing = []
+        for domain in set(domains):
+            record = self._cached(domain)
+            if record is None:
+                missing.append(domain)
+            else:
+                results[domain] = record
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                for record in pool.map(self.resolver.resolve, missing):
+                    if record.definitive:
+                        self._store(record)
+                    results[record.domain] = record
+        return results
+
+    @contextlib.contextmanager
+    def batch(self, domains: Iterable[str]) -> Iterator[Dict[str, DnsRecord]]:
+        """`check` the domains and keep the dead ones known until the block exits."""
+        records = self.check(domains)
+        dead = [domain for domain, record in records.items() if record.definitive and not record.resolvable]
+        with self._lock:
+            self._pinned.update(dead)
+        try:
+            yield records
+        finally:
+            with self._lock:
+                self._pinned.subtract(dead)
+                for domain in dead:
+                    if self._pinned[domain] <= 0:
+                        del self._pinned[domain]
+
+    def is_unreachable(self, domain: str) -> bool:
+        """True only for domains already checked and found unresolvable."""
+        if domain in self._pinned:
+            return True
+        record = self._cached(domain)
+        return record is not None and not record.resolvable
@@ -0,0 +1,82 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional, Union
+from urllib.parse import urlparse
+
+import tldextract
+
+from domain_knowledge9 import get_knowledge_base, DISPOSABLE, FREE_EMAIL, UNIVERSITY
+
+
+# Offline extractor: no suffix list download, only the snapshot bundled with tldextract
+_extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None, fallback_to_snapshot=True)
+
+
+class DomainKey(NamedTuple):
+    """
+    Normalized view of an email domain, computed once per email and
+    shared by every stage. Caches key on `registrable`, so
+    `dps.centrin.net.id` and `centrin.net.id` share one entry.
+    """
+    domain: str                 # full normalized host, e.g. "dps.centrin.net.id"
+    registrable: str            # registrable domain, e.g. "centrin.net.id"
+    subdomain: str              # e.g. "dps"
+    suffix: str                 # public suffix, e.g. "net.id"
+    name: str                   # registrable label without suffix, e.g. "centrin"
+    is_free_email: bool
+    is_disposable: bool
+    university: Optional[str]   # knowledge base university name, if any
+    academic_suffix: bool       # suffix like "edu", "ac.in", "edu.au"
+
+    def __str__(self) -> str:
+        return self.domain
+
+
+def normalize_host(domain: str) -> str:
+    """Lowercase, strip scheme/path/port, `www.` and trailing dots."""
+    domain = domain.strip().lower()
+    if "://" in domain:
+        domain = urlparse(domain).netloc
+    domain = domain.split("/", 1)[0].split(":", 1)[0].rstrip(".")
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
+
+
+@lru_cache(maxsize=100_000)
+def get_domain_key(domain: str) -> DomainKey:
+    host = normalize_host(domain)
+    ext = _extractor(host)
+    suffix = ext.suffix
+    if ext.domain and suffix:
+        registrable = f"{ext.domain}.{suffix}"
+        name = ext.domain
+        subdomain = ext.subdomain
+    else:
+        # Unknown suffix, bare label or IP: treat the whole host as registrable
+        registrable = host
+        name = ext.domain or host.split(".")[0]
+        subdomain = ""
+
+    kb = get_knowledge_base()
+    hit = kb.lookup(host)
+    kind = hit[0] if hit else None
+    suffix_labels = suffix.split(".") if suffix else []
+
+    return DomainKey(
+        domain=host,
+        registrable=registrable,
+        subdomain=subdomain,
+        suffix=suffix,
+        name=name,
+        is_free_email=kind in (FREE_EMAIL, DISPOSABLE),
+        is_disposable=kind == DISPOSABLE,
+        university=hit[1] if kind == UNIVERSITY else None,
+        academic_suffix="edu" in suffix_labels or "ac" in suffix_labels
+    )
+
+
+def as_domain_key(domain: Union[str, DomainKey]) -> DomainKey:
+    """Accept either a raw domain string or an already computed DomainKey."""
+    if isinstance(domain, DomainKey):
+        return domain
+    return get_domain_key(domain)
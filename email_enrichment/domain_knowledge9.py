@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+FREE_EMAIL = "free_email"
+DISPOSABLE = "disposable"
+UNIVERSITY = "university"
+
+
+def reverse_labels(domain: str) -> str:
+    """'cs.stanford.edu' -> 'edu.stanford.cs' (index sort key)."""
+    return ".".join(reversed(domain.split(".")))
+
+
+class DomainKnowledgeBase:
+    """
+    Offline lookup table for free webmail, disposable and university domains.
+
+    The on-disk index is a TSV sorted by reversed labels
+    (`edu.stanford<TAB>university<TAB>Stanford University`), so related
+    domains sit next to each other and the file can be regenerated and
+    diffed easily. It is loaded once into a dict; lookups walk the parent
+    labels of the query, so `cs.stanford.edu` resolves to `stanford.edu`
+    in a handful of dict probes.
+    """
+
+    INDEX_FILE = os.path.join(DATA_DIR, "domain_kb.tsv")
+
+    def __init__(self, index_file: Optional[str] = None):
+        self.index_file = index_file or self.INDEX_FILE
+        self.entries: Dict[str, Tuple[str, str]] = self.load_index(self.index_file)
+
+    # -------------------------
+    # Loading
+    # -------------------------
+    @staticmethod
+    def load_index(path: str) -> Dict[str, Tuple[str, str]]:
+        entries: Dict[str, Tuple[str, str]] = {}
+        if not os.path.exists(path):
+            return entries
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                key, kind, name = line.rstrip("\n").split("\t", 2)
+                entries[reverse_labels(key)] = (kind, name)
+        return entries
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def lookup(self, domain: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Return (kind, name, matched_domain) for the most specific entry
+        that equals `domain` or is a parent of it, else None.
+        """
+        if not domain:
+            return None
+        domain = domain.strip().lower().rstrip(".")
+        entries = self.entries
+        while True:
+            hit = entries.get(domain)
+            if hit is not None:
+                return hit[0], hit[1], domain
+            dot = domain.find(".")
+            if dot < 0:
+                return None
+            domain = domain[dot + 1:]
+
+    def kind(self, domain: str) -> Optional[str]:
+        hit = self.lookup(domain)
+        return hit[0] if hit else None
+
+    def is_free_email(self, domain: str) -> bool:
+        return self.kind(domain) in (FREE_EMAIL, DISPOSABLE)
+
+    def is_disposable(self, domain: str) -> bool:
+        return self.kind(domain) == DISPOSABLE
+
+    def university(self, domain: str) -> Optional[Tuple[str, str]]:
+        """Return (university_name, matched_domain) or None."""
+        hit = self.lookup(domain)
+        if hit and hit[0] == UNIVERSITY:
+            return hit[1], hit[2]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+@lru_cache(maxsize=None)
+def get_knowledge_base(index_file: Optional[str] = None) -> DomainKnowledgeBase:
+    """Shared, process-wide knowledge base instance."""
+    return DomainKnowledgeBase(index_file)
+
+
+# -------------------------
+# Index builder
+# -------------------------
+def read_domain_list(path: str) -> List[Tuple[str, str]]:
+    """
+    Read `domain` or `domain<TAB>name` lines, or a JSON list in the
+    world-universities format (`[{"name": ..., "domains": [...]}, ...]`).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [
+                (domain, item.get("name", ""))
+                for item in json.load(f)
+                for domain in item.get("domains", [])
+            ]
+        pairs = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            domain, _, name = line.partition("\t")
+            pairs.append((domain, name))
+        return pairs
+
+
+def build_index(
+    sources: Iterable[Tuple[str, Iterable[Tuple[str, str]]]],
+    output: str,
+    existing: Optional[str] = None
+) -> int:
+    """
+    Merge (kind, [(domain, name), ...]) sources into a sorted TSV index.
+    Later sources win over earlier ones and over `existing` entries.
+    """
+    merged: Dict[str, Tuple[str, str]] = {}
+    if existing:
+        merged.update(DomainKnowledgeBase.load_index(existing))
+    for kind, pairs in sources:
+        for domain, name in pairs:
+            domain = domain.strip().lower().rstrip(".")
+            if domain.startswith("www."):
+                domain = domain[4:]
+            # A bare label (e.g. 'www.com' after stripping) would match a whole TLD
+            if "." in domain:
+                merged[domain] = (kind, name.replace("\t", " ").strip())
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write("# reversed_domain\tkind\tname\n")
+        for key in sorted(reverse_labels(d) for d in merged):
+            kind, name = merged[reverse_labels(key)]
+            f.write(f"{key}\t{kind}\t{name}\n")
+    return len(merged)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the offline domain knowledge base index")
+    parser.add_argument("--free", action="append", default=[], help="Free webmail domain list")
+    parser.add_argument("--disposable", action="append", default=[], help="Disposable email domain list")
+    parser.add_argument("--universities", action="append", default=[], help="University list (TSV or JSON)")
+    parser.add_argument("--output", default=DomainKnowledgeBase.INDEX_FILE)
+    parser.add_argument("--replace", action="store_true", help="Do not keep entries of the current index")
+    args = parser.parse_args(argv)
+
+    sources = (
+        [(FREE_EMAIL, read_domain_list(p)) for p in args.free]
+        + [(DISPOSABLE, read_domain_list(p)) for p in args.disposable]
+        + [(UNIVERSITY, read_domain_list(p)) for p in args.universities]
+    )
+    existing = None if args.replace or not os.path.exists(args.output) else args.output
+    count = build_index(sources, args.output, existing)
+    print(f"Wrote {count} domains to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,39 @@
-import re
-from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 
+from domain_key10 import normalize_host
+from search_provider15 import get_search_provider
+from json_store21 import save_json
+
+def is_provisional(info: Dict) -> bool:
+    """Info that derived caches must not keep: the domain did not resolve or its search was skipped."""
+    return bool(info.get("unreachable") or info.get("search_skipped"))
+
+
 class DomainScraper:
+    CACHE_FILE = "domain_info_cache.json"
+
     def __init__(self):
+        # Cached pages: extracted info + HTTP validators + content hashes
+        self.page_cache: Dict[str, Dict] = self.load_cache()
+        self.ttl = 7 * 86400            # scraped pages are revalidated after a week
+        self.failure_ttl = 86400        # failed fetches are retried after a day
         self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
         self.timeout = 5
+        # Optional DnsPreflight shared by the engine; unresolvable domains skip the network
+        self.preflight = None
+        # Shared, cached and rate-limited search fallback
+        self.search = get_search_provider()
+        # Striped per-domain locks: concurrent stages asking for the same page fetch it once
+        self._fetch_locks = [threading.Lock() for _ in range(64)]
         self.sector_keywords = {
             "Technology": ["software", "technology", "ai", "ml", "cloud", "saas", "fintech", "edtech", "devops", "digital", "app", "platform"],
             "Finance": ["bank", "finance", "investment", "trading", "crypto", "insurance"],
@@ -22,39 +48,161 @@ class DomainScraper:
         }
 
     def normalize_url(self, domain: str) -> str:
-        parsed = urlparse(domain if domain.startswith("http") else f"https://{domain}")
-        scheme = parsed.scheme or "https"
-        netloc = parsed.netloc or parsed.path
-        if netloc.startswith("www."):
-            netloc = netloc[4:]
-        return f"{scheme}://{netloc}".rstrip("/")
+        scheme = urlparse(domain).scheme if domain.startswith("http") else "https"
+        return f"{scheme or 'https'}://{normalize_host(domain)}"
 
     def is_university_domain(self, domain: str) -> bool:
         keywords = ["university", "college", "institute", "school", "academy", ".edu", ".ac."]
         return any(k in domain.lower() for k in keywords)
 
+    def unreachable_info(self, domain: str) -> Optional[Dict]:
+        """Placeholder info for a domain DNS pre-flight found dead, else None."""
+        if self.preflight is not None and self.preflight.is_unreachable(normalize_host(domain)):
+            # Dead domain: no request, no search fallback
+            return {"domain": domain, "company_name": None, "description": None, "sector": "Unknown", "scraped": False, "unreachable": True, "error": "DNS: domain does not resolve"}
+        return None
+
+    def fetch_lock(self, key: str) -> threading.Lock:
+        return self._fetch_locks[hash(key) % len(self._fetch_locks)]
+
     def get_domain_info(self, domain: str) -> Dict:
+        dead = self.unreachable_info(domain)
+        if dead is not None:
+            return dead
+
+        key = normalize_host(domain)
+        entry = self.page_cache.get(key)
+        if entry and not self.is_stale(entry):
+            return entry["info"]
+        with self.fetch_lock(key):
+            # Another stage may have fetched it while we waited
+            entry = self.page_cache.get(key)
+            if entry and not self.is_stale(entry):
+                return entry["info"]
+            info, _ = self._refresh(domain)
+        return info
+
+    def entry_ttl(self, entry: Dict) -> float:
+        # Failed fetches and pages whose search fallback was skipped are retried sooner
+        info = entry["info"]
+        return self.ttl if info.get("scraped") and not info.get("search_skipped") else self.failure_ttl
+
+    def is_stale(self, entry: Dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) > self.entry_ttl(entry)
+
+    def refresh(self, domain: str) -> Tuple[Dict, bool]:
+        """
+        Fetch (or revalidate) a domain's homepage and update the cache.
+        Sends If-None-Match / If-Modified-Since for cached pages; on 304 or
+        an identical body the cached info is reused without parsing.
+        Returns (info, changed) where `changed` is False when the
+        extracted fields are the same as before. A failed fetch keeps a
+        previously scraped page unchanged. Domains pre-flight found dead
+        are not fetched, and concurrent callers (stages, the cache warmer)
+        take turns per domain.
+        """
+        dead = self.unreachable_info(domain)
+        if dead is not None:
+            return dead, False
+        with self.fetch_lock(normalize_host(domain)):
+            return self._refresh(domain)
+
+    def _refresh(self, domain: str) -> Tuple[Dict, bool]:
+        # Callers hold the domain's fetch lock
+        key = normalize_host(domain)
         url = self.normalize_url(domain)
+        entry = self.page_cache.get(key)
+        headers = dict(self.headers)
+        if entry and entry["info"].get("scraped"):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
         try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout, allow_redirects=True)
+            response = requests.get(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+            if response.status_code == 304 and entry:
+                self.store(key, entry["info"], response, entry["body_hash"], entry["content_hash"])
+                return entry["info"], False
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
 
-            if self.is_university_domain(domain):
-                name = self.extract_university_name(soup, domain)
-                sector = "Education"
-            else:
-                name = self.extract_company_name(soup, domain)
-                description = self.extract_description(soup)
-                sector = self.extract_sector(soup, description, domain)
-
-            return {"domain": domain, "company_name": name, "description": self.extract_description(soup), "sector": sector, "scraped": True}
+            body_hash = hashlib.sha1(response.content).hexdigest()
+            if entry and entry.get("body_hash") == body_hash:
+                # Same bytes as last time: skip parsing and classification
+                self.store(key, entry["info"], response, body_hash, entry["content_hash"])
+                return entry["info"], False
 
+            info = self.parse_page(response.content, domain)
         except Exception as e:
+            if entry and entry["info"].get("scraped"):
+                # Keep the last good page and retry once failure_ttl has passed
+                self.page_cache[key] = dict(
+                    entry,
+                    fetched_at=time.time() - self.ttl + self.failure_ttl,
+                    failed_at=time.time()
+                )
+                self.save_cache()
+                return entry["info"], False
             snippets = self.search_google_like(domain)
-            snippet_text = " ".join(snippets).lower()
-            sector = self.detect_sector_from_text(snippet_text)
-            return {"domain": domain, "company_name": None, "description": None, "sector": sector, "scraped": False, "error": f"{type(e).__name__}: {e}"}
+            sector = self.detect_sector_from_text(" ".join(snippets or []).lower())
+            info = {"domain": domain, "company_name": None, "description": None, "sector": sector, "scraped": False, "error": f"{type(e).__name__}: {e}"}
+            if snippets is None:
+                info["search_skipped"] = True
+            body_hash = None
+            response = None
+
+        content_hash = self.fields_hash(info)
+        changed = not entry or entry.get("content_hash") != content_hash
+        self.store(key, info, response, body_hash, content_hash)
+        return info, changed
+
+    def parse_page(self, content: bytes, domain: str) -> Dict:
+        soup = BeautifulSoup(content, "html.parser")
+
+        if self.is_university_domain(domain):
+            name = self.extract_university_name(soup, domain)
+            sector = "Education"
+        else:
+            name = self.extract_company_name(soup, domain)
+            description = self.extract_description(soup)
+            sector = self.extract_sector(soup, description, domain)
+
+        info = {"domain": domain, "company_name": name, "description": self.extract_description(soup), "sector": sector or "Unknown", "scraped": True}
+        if sector is None:
+            info["search_skipped"] = True
+        return info
+
+    @staticmethod
+    def fields_hash(info: Dict) -> str:
+        fields = {k: info.get(k) for k in ("company_name", "description", "sector", "scraped")}
+        return hashlib.sha1(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # Cache handling
+    def store(self, key: str, info: Dict, response, body_hash: Optional[str], content_hash: str):
+        headers = response.headers if response is not None else {}
+        # A 304 usually omits validators: keep the ones we already have
+        previous = self.page_cache.get(key, {}) if response is not None else {}
+        self.page_cache[key] = {
+            "info": info,
+            "fetched_at": time.time(),
+            "etag": headers.get("ETag") or previous.get("etag"),
+            "last_modified": headers.get("Last-Modified") or previous.get("last_modified"),
+            "body_hash": body_hash,
+            "content_hash": content_hash
+        }
+        self.save_cache()
+
+    def load_cache(self) -> Dict[str, Dict]:
+        if os.path.exists(self.CACHE_FILE):
+            try:
+                with open(self.CACHE_FILE, "r") as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        return {}
+
+    def save_cache(self):
+        save_json(self.CACHE_FILE, self.page_cache)
 
     # Name & description extraction
     def extract_company_name(self, soup: BeautifulSoup, domain: str) -> str:
@@ -90,7 +238,8 @@ class DomainScraper:
         return None
 
     # Sector detection
-    def extract_sector(self, soup: BeautifulSoup, description: Optional[str], domain: str) -> str:
+    def extract_sector(self, soup: BeautifulSoup, description: Optional[str], domain: str) -> Optional[str]:
+        """The page's sector, or None if the page had no clue and the search fallback was skipped."""
         text = ""
         if soup.body:
             text += soup.body.get_text(separator=" ", strip=True).lower()
@@ -106,8 +255,9 @@ class DomainScraper:
         if sector != "Unknown":
             return sector
         snippets = self.search_google_like(f"{domain} company sector")
-        snippet_text = " ".join(snippets).lower()
-        return self.detect_sector_from_text(snippet_text)
+        if snippets is None:
+            return None
+        return self.detect_sector_from_text(" ".join(snippets).lower())
 
     def detect_sector_from_text(self, text: str) -> str:
         for sector, keywords in self.sector_keywords.items():
@@ -116,19 +266,24 @@ class DomainScraper:
         return "Unknown"
 
     # Fallback search
-    def search_google_like(self, query: str) -> List[str]:
-        try:
-            url = "https://duckduckgo.com/html"
-            params = {"q": query}
-            response = requests.get(url, params=params, headers=self.headers, timeout=self.timeout)
-            soup = BeautifulSoup(response.content, "html.parser")
-            snippets = []
-            for link in soup.find_all("a", href=re.compile("http")):
-                text = link.get_text(strip=True)
-                if text and text not in snippets:
-                    snippets.append(text)
-                if len(snippets) >= 5:
-                    break
-            return snippets
-        except Exception:
-            return []
+    def search_google_like(self, query: str) -> Optional[List[str]]:
+        """Up to five result snippets; None when the search was skipped (breaker open, rate limited)."""
+        results = self.search.search(query)
+        if results is None:
+            return None
+        snippets = []
+        for href, text in results:
+            if "http" in href and text and text not in snippets:
+                snippets.append(text)
+            if len(snippets) >= 5:
+                break
+        return snippets
+
+
+@lru_cache(maxsize=None)
+def get_domain_scraper() -> DomainScraper:
+    """
+    Process-wide scraper: every component reads and saves the same page
+    cache, instead of each instance overwriting the others' JSON file.
+    """
+    return DomainScraper()
@@ -1,17 +1,52 @@
 import json
+import logging
 import os
-from typing import Dict, Tuple
-from urllib.parse import urlparse
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
 
-import gensim.downloader as api
-from gensim.models import KeyedVectors
+from domain_scraper6 import DomainScraper, is_provisional
+from domain_knowledge9 import DISPOSABLE, FREE_EMAIL, UNIVERSITY
+from domain_key10 import DomainKey, as_domain_key, normalize_host
+from json_store21 import save_json
 
-from domain_scraper6 import DomainScraper
+if TYPE_CHECKING:
+    from gensim.models import KeyedVectors
+
+logger = logging.getLogger(__name__)
+
+UNIVERSITY_KEYWORDS = ["university", "college", "institute", "school", "academy"]
+UNIVERSITY_SUFFIXES = [".edu", ".edu.in", ".ac.in", ".ac.uk", ".ac.id", ".ac.jp", ".ac.nz"]
+
+
+def rule_domain_type(domain: Union[str, DomainKey]) -> Tuple[str, float]:
+    """Knowledge base + suffix/keyword rules only: no network, no word vectors."""
+    key = as_domain_key(domain)
+    if key.is_disposable:
+        return DISPOSABLE, 1.0
+    if key.is_free_email:
+        return FREE_EMAIL, 1.0
+    if key.university:
+        return UNIVERSITY, 1.0
+    if any(key.registrable.endswith(s) for s in UNIVERSITY_SUFFIXES) or \
+            any(kw in key.registrable for kw in UNIVERSITY_KEYWORDS):
+        return "university", 0.7
+    return "company", 0.6
+
+
+def domain_type_label(domain_type: str, conf: float) -> str:
+    if domain_type == "free_email":
+        return f"Free Webmail ({conf*100:.0f}% confidence)"
+    elif domain_type == "disposable":
+        return f"Disposable Email ({conf*100:.0f}% confidence)"
+    elif domain_type == "university":
+        return f"University/Educational ({conf*100:.0f}% confidence)"
+    else:
+        return f"Company/Business ({conf*100:.0f}% confidence)"
 
 
 class DomainTypeDetectorFastText:
     CACHE_FILE = "domain_cache_fasttext.json"
-    _word_vectors: KeyedVectors = None  # static cache for GloVe model
+    _word_vectors: Optional["KeyedVectors"] = None  # static cache for GloVe model
 
     def __init__(self, scraper: DomainScraper):
         self.scraper = scraper
@@ -19,42 +54,26 @@ class DomainTypeDetectorFastText:
 
         # Load GloVe small model only once globally
         if DomainTypeDetectorFastText._word_vectors is None:
-            print("Loading GloVe model (glove-twitter-100)...")
+            # Imported here so pipelines that never build a detector skip gensim entirely
+            import gensim.downloader as api
+
+            logger.info("Loading GloVe model (glove-twitter-100)...")
             DomainTypeDetectorFastText._word_vectors = api.load("glove-twitter-100")
-            print("GloVe model loaded!")
+            logger.info("GloVe model loaded!")
 
         self.word_vectors = DomainTypeDetectorFastText._word_vectors
 
-        # Free email domains
-        self.free_email_domains: Dict[str, str] = {
-            "gmail.com": "Free webmail (Google)",
-            "yahoo.com": "Free webmail (Yahoo)",
-            "outlook.com": "Free webmail (Microsoft)",
-            "hotmail.com": "Free webmail (Microsoft)",
-            "aol.com": "Free webmail (AOL)",
-            "protonmail.com": "Free webmail (ProtonMail)",
-            "icloud.com": "Free webmail (Apple)",
-            "mail.com": "Free webmail"
-        }
-
         # University keywords
-        self.university_keywords = ["university", "college", "institute", "school", "academy"]
+        self.university_keywords = UNIVERSITY_KEYWORDS
 
         # University domain suffixes
-        self.university_suffixes = [".edu", ".edu.in", ".ac.in", ".ac.uk", ".ac.id", ".ac.jp", ".ac.nz"]
+        self.university_suffixes = UNIVERSITY_SUFFIXES
 
     # -------------------------
     # Helpers
     # -------------------------
     def normalize_domain(self, domain: str) -> str:
-        domain = domain.strip().lower()
-        if domain.startswith("http"):
-            domain = urlparse(domain).netloc
-        if domain.startswith("www."):
-            domain = domain[4:]
-        if domain.endswith("/"):
-            domain = domain.rstrip("/")
-        return domain
+        return normalize_host(domain)
 
     def load_cache(self) -> Dict[str, Dict]:
         if os.path.exists(self.CACHE_FILE):
@@ -66,8 +85,7 @@ class DomainTypeDetectorFastText:
         return {}
 
     def save_cache(self):
-        with open(self.CACHE_FILE, "w") as f:
-            json.dump(self.domain_cache, f, indent=2)
+        save_json(self.CACHE_FILE, self.domain_cache)
 
     def fasttext_similarity(self, domain_name: str, keywords: list) -> float:
         """Compute max cosine similarity between domain words and keywords using GloVe."""
@@ -91,60 +109,66 @@ class DomainTypeDetectorFastText:
             return True
         return False
 
+    def offline_guess(self, domain: str) -> Tuple[str, float]:
+        """Rules + GloVe guess that needs no network access."""
+        if self.is_university_domain(domain):
+            return ("university", 0.7)
+        sim = self.fasttext_similarity(domain, self.university_keywords)
+        return ("university", 0.75) if sim > 0.5 else ("company", 0.6)
+
     # -------------------------
     # Main detection
     # -------------------------
-    def identify_domain_type(self, domain: str) -> Tuple[str, float]:
-        domain = self.normalize_domain(domain)
+    def identify_domain_type(self, domain: Union[str, DomainKey]) -> Tuple[str, float]:
+        key = as_domain_key(domain)
+        # Cache and scrape on the registrable domain so subdomains share one entry
+        domain = key.registrable
+
+        # 1️⃣ Known webmail / disposable / university domain (offline, no cache write)
+        if key.is_disposable:
+            return DISPOSABLE, 1.0
+        if key.is_free_email:
+            return FREE_EMAIL, 1.0
+        if key.university:
+            return UNIVERSITY, 1.0
 
         # Check cache
         if domain in self.domain_cache:
             cached = self.domain_cache[domain]
             return cached["type"], cached["confidence"]
 
-        # 1️⃣ Free email domain
-        if domain in self.free_email_domains:
-            result = ("free_email", 1.0)
-
-        else:
-            try:
-                info = self.scraper.get_domain_info(domain)
-                sector = info.get("sector", "").lower()
-                company_name = info.get("company_name", "")
-
-                # 2️⃣ Scraper detects university
-                if "education" in sector or "university" in company_name.lower():
-                    result = ("university", 0.9)
-                elif sector:
-                    result = ("company", 0.8)
-                else:
-                    # 3️⃣ Fallback: rules + GloVe
-                    if self.is_university_domain(domain):
-                        result = ("university", 0.7)
-                    else:
-                        sim = self.fasttext_similarity(domain, self.university_keywords)
-                        result = ("university", 0.75) if sim > 0.5 else ("company", 0.6)
-            except Exception:
-                # 4️⃣ Fallback if scraper fails
-                if self.is_university_domain(domain):
-                    result = ("university", 0.7)
-                else:
-                    sim = self.fasttext_similarity(domain, self.university_keywords)
-                    result = ("university", 0.75) if sim > 0.5 else ("company", 0.6)
+        info: Dict = {}
+        try:
+            info = self.scraper.get_domain_info(domain)
+            sector = (info.get("sector") or "").lower()
+            company_name = info.get("company_name") or ""
+
+            if info.get("unreachable"):
+                # Domain does not resolve (DNS pre-flight): offline heuristics only
+                result = self.offline_guess(domain)
+            # 2️⃣ Scraper detects university
+            elif "education" in sector or "university" in company_name.lower():
+                result = ("university", 0.9)
+            elif sector:
+                result = ("company", 0.8)
+            else:
+                # 3️⃣ Fallback: rules + GloVe
+                result = self.offline_guess(domain)
+        except Exception:
+            # 4️⃣ Fallback if scraper fails
+            result = self.offline_guess(domain)
+
+        if is_provisional(info):
+            # Unresolved domain or skipped search: answer now, look it up again next time
+            return result
 
         # Cache result
-        self.domain_cache[domain] = {"type": result[0], "confidence": result[1]}
+        self.domain_cache[domain] = {"type": result[0], "confidence": result[1], "updated_at": time.time()}
         self.save_cache()
         return result
 
     # -------------------------
     # Human-readable label
     # -------------------------
-    def get_domain_type_label(self, domain: str) -> str:
-        domain_type, conf = self.identify_domain_type(domain)
-        if domain_type == "free_email":
-            return f"Free Webmail ({conf*100:.0f}% confidence)"
-        elif domain_type == "university":
-            return f"University/Educational ({conf*100:.0f}% confidence)"
-        else:
-            return f"Company/Business ({conf*100:.0f}% confidence)"
+    def get_domain_type_label(self, domain: Union[str, DomainKey]) -> str:
+        return domain_type_label(*self.identify_domain_type(domain))
@@ -1,55 +1,102 @@
-from typing import List, Dict
-from company_finder4 import CompanyFinder
-from person_name_extractor2 import PersonNameExtractor
+import contextlib
+import logging
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from email_validator3 import EmailValidator
-from sector_extractor5 import SectorExtractor
+from domain_key10 import get_domain_key
+from dns_preflight12 import DnsPreflight
+from result_columns14 import ResultColumns
+from profiling18 import BatchProfiler, profiler_from_env
+from pipeline19 import STAGE_THREAD_PREFIX, Components, build_pipeline
+from cache_snapshot20 import apply_snapshot, collect, merge_sections, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
 
 class EnrichmentEngine:
-    def __init__(self):
-        self.company_finder = CompanyFinder()
-        self.name_extractor = PersonNameExtractor()
+    def __init__(self, preflight: Optional[DnsPreflight] = None, pipeline: str = "standard", stage_workers: int = 4):
         self.validator = EmailValidator()
-        self.sector_extractor = SectorExtractor()
+
+        # DNS pre-flight for batches; pass DnsPreflight(StubResolver(...)) in tests
+        self.preflight = preflight or DnsPreflight()
+
+        # Components are built on first use and share one DomainScraper
+        self.components = Components(self.preflight)
+
+        # Stages to run per email ("offline-fast", "standard", "deep-scrape");
+        # independent ones (name, domain type, university, company) run concurrently
+        self.executor = (
+            ThreadPoolExecutor(stage_workers, thread_name_prefix=STAGE_THREAD_PREFIX)
+            if stage_workers > 1 else None
+        )
+        self.pipeline = build_pipeline(pipeline, self.executor)
+
+        # Optional CacheWarmer; sees every enriched domain to find hot ones
+        self.warmer = None
+
+        # Opt-in batch profiling, e.g. {"mode": "sampling", "track_memory": True};
+        # falls back to the ENRICHMENT_PROFILE env var when unset
+        self.profile: Optional[Dict] = None
+
+        # Per-thread flags: a cProfile'd batch runs its stages inline on its own thread only
+        self._local = threading.local()
+
+        # Loaded cache snapshot sections, kept so exports include caches of unbuilt components
+        self.snapshot_sections: Dict[str, Dict] = {}
+
+    @property
+    def company_finder(self):
+        return self.components.get("company_finder")
+
+    @property
+    def name_extractor(self):
+        return self.components.get("name_extractor")
+
+    @property
+    def sector_extractor(self):
+        return self.components.get("sector_extractor")
 
     # -------------------------
     # Single Email Enrichment
     # -------------------------
     def enrich_email(self, email: str) -> Dict:
-        if not self.validator.validate_email(email):
-            return {"email": email, "error": "Invalid email format"}
-
-        email_lower = email.lower()
-        email_user, email_domain = email_lower.split("@")
+        # Same normalization as a batch row: strip, lowercase, IDN -> punycode, drop "+tag"
+        batch = self.validator.validate_batch([email])
+        return batch.expand([self.enrich_parts(*parts) for parts in batch.unique_parts])[0]
 
-        # ✅ KEY CHANGE: Pass the full email instead of just the username
-        # This allows PersonNameExtractor to:
-        # 1. Parse the username (elon.musk → Elon Musk)
-        # 2. Use the domain for web scraping if needed
-        likely_person = self.name_extractor.extract_person_name(email_lower)
-        
-        domain_type_label = self.company_finder.get_domain_type_label(email_domain)
+    def enrich_parts(self, email: str, email_user: str, email_domain: str) -> Dict:
+        """Enrich an already validated email split into (plus-stripped) user and domain."""
+        started = time.perf_counter()
+        # Normalize the domain once; every stage keys its caches on this
+        domain_key = get_domain_key(email_domain)
+        if self.warmer is not None:
+            self.warmer.record(domain_key.registrable)
 
-        related_university, university_domain, uni_confidence = self.company_finder.find_related_university(email_domain, likely_person)
-        related_company, company_domain, company_confidence, detected_sector = self.company_finder.find_related_company(email_domain, likely_person)
+        ctx = {"email": email, "email_user": email_user, "email_domain": email_domain, "domain_key": domain_key}
+        timings = self.pipeline.run(self.components, ctx, inline=getattr(self._local, "inline", False))
+        related_university, university_domain, uni_confidence = ctx["university"]
+        related_company, company_domain, company_confidence, _ = ctx["company"]
 
-        sector = "Unknown"
-        if detected_sector:
-            sector = detected_sector
-        elif company_domain:
-            sector = self.sector_extractor.extract_sector(company_domain)
-        elif university_domain:
-            sector = "Education"
+        # Per-row record: sampled by the logging setup, never the full result
+        logger.info("row enriched", extra={
+            "sample": True,
+            "email_domain": domain_key.registrable,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            **{f"{stage}_ms": round(ms, 2) for stage, ms in timings.items()},
+        })
 
         return {
             "email": email,
             "email_domain": email_domain,
-            "domain_type": domain_type_label,
-            "likely_person": likely_person or "N/A",
+            "domain_type": ctx["domain_type"],
+            "likely_person": ctx["likely_person"] or "N/A",
             "related_university": related_university or "N/A",
             "university_domain": university_domain or "N/A",
             "related_company": related_company or "N/A",
             "company_domain": company_domain or "N/A",
-            "sector": sector,
+            "sector": ctx["sector"],
             "confidence": {
                 "domain": "High",
                 "university": uni_confidence,
@@ -61,7 +108,136 @@ class EnrichmentEngine:
     # Batch Enrichment
     # -------------------------
     def enrich_batch(self, emails: List[str]) -> List[Dict]:
-        return [self.enrich_email(email) for email in emails]
+        with self.profiler("enrich_batch"):
+            # Validate, normalize and dedupe the whole batch up front;
+            # invalid rows never reach the engine
+            batch = self.validator.validate_batch(emails)
+            with self.preflight_domains(batch.domain[i] for i in batch.uniques):
+                results = [self.enrich_parts(*parts) for parts in batch.unique_parts]
+            return batch.expand(results)
+
+    def enrich_batch_columnar(self, emails: List[str]) -> ResultColumns:
+        """Like `enrich_batch`, but collects rows into a compact ResultColumns store."""
+        columns = ResultColumns(capacity=len(emails))
+        with self.profiler("enrich_batch_columnar"):
+            for _, result in self.iter_enrich_batch(emails, rows=columns):
+                columns.append(result)
+        return columns
+
+    @contextlib.contextmanager
+    def profiler(self, label: str):
+        """Profiling context for one batch run; a no-op unless profiling was opted into."""
+        profiler = BatchProfiler(label=label, **self.profile) if self.profile else profiler_from_env(label)
+        previous = getattr(self._local, "inline", False)
+        try:
+            with profiler:
+                # cProfile only sees the calling thread, so this thread's stages run inline
+                # while it records; other batches on the shared engine keep the executor
+                self._local.inline = previous or getattr(profiler, "mode", None) == "cprofile"
+                yield profiler
+        finally:
+            self._local.inline = previous
+
+    @contextlib.contextmanager
+    def preflight_domains(self, domains):
+        """
+        Resolve every unique registrable domain of a batch before enrichment
+        starts; dead ones stay known to the scraper until the block exits.
+        """
+        if not self.pipeline.network:
+            yield  # offline pipelines never touch the network
+            return
+        keys = [get_domain_key(d) for d in domains]
+        # Webmail never hits the network; known universities still do in the name stage
+        with self.preflight.batch({k.registrable for k in keys if not k.is_free_email}):
+            yield
+
+    def iter_enrich_batch(self, emails: List[str], rows: Optional[ResultColumns] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        Streaming variant of `enrich_batch`: yields (row_index, result) in
+        input order as soon as each row is done. Duplicates are rebuilt
+        from the stored row of their first occurrence. Pass the
+        ResultColumns the caller appends every yielded result to as `rows`;
+        otherwise unique results are kept in a private one.
+        """
+        batch = self.validator.validate_batch(emails)
+        store = rows if rows is not None else ResultColumns(capacity=len(batch.uniques))
+        base = len(store)
+        # Row of each unique email's first occurrence in `store` (-1 = not enriched yet)
+        first_row = array("l", [-1]) * len(batch.uniques)
+        with self.preflight_domains(batch.domain[i] for i in batch.uniques):
+            for idx, pos in enumerate(batch.inverse):
+                if pos < 0:
+                    yield idx, {"email": batch.original[idx], "error": "Invalid email format"}
+                    continue
+                if first_row[pos] >= 0:
+                    yield idx, dict(store.row(first_row[pos]), email=batch.original[idx])
+                    continue
+                first = batch.uniques[pos]
+                try:
+                    result = self.enrich_parts(
+                        batch.normalized[first], batch.local_base[first], batch.domain[first]
+                    )
+                except Exception as e:
+                    # One bad row must not stop a streaming batch
+                    result = {"email": batch.original[idx], "error": str(e)}
+                result["email"] = batch.original[idx]
+                first_row[pos] = base + idx if rows is not None else store.append(result)
+                yield idx, result
+
+    # -------------------------
+    # Cache invalidation
+    # -------------------------
+    def invalidate_domains(self, domains: Iterable[str]) -> int:
+        """
+        Forget what the engine caches hold for `domains` (any host form), so
+        their next lookup is recomputed. Cached pages are only marked stale:
+        the refetch stays conditional and may come back as a cheap 304.
+        Components that are not built yet are cleaned right after they are.
+        """
+        keys = {get_domain_key(d).registrable for d in domains} - {""}
+        if not keys:
+            return 0
+
+        def expire_pages(scraper):
+            for key in keys:
+                entry = scraper.page_cache.get(key)
+                if entry is not None:
+                    scraper.page_cache[key] = dict(
+                        {k: v for k, v in entry.items() if k != "failed_at"}, fetched_at=0
+                    )
+
+        def drop(attribute):
+            def callback(component):
+                cache = getattr(component, attribute)
+                for key in keys:
+                    cache.pop(key, None)
+            return callback
+
+        self.components.when_built("scraper", expire_pages)
+        self.components.when_built("company_finder", drop("university_cache"))
+        self.components.when_built("detector", drop("domain_cache"))
+        self.components.when_built("sector_extractor", drop("sector_cache"))
+        self.components.when_built("name_extractor", drop("domain_names"))
+        # Loaded snapshot sections would otherwise seed the old entries back on export
+        for entries in self.snapshot_sections.values():
+            for key in keys:
+                entries.pop(key, None)
+        return len(keys)
+
+    # -------------------------
+    # Cache snapshots
+    # -------------------------
+    def load_snapshot(self, path: str, policy: str = "newest") -> Dict[str, int]:
+        """Seed the engine caches from a snapshot file; returns entries per cache."""
+        _, sections = read_snapshot(path)
+        scheduled = apply_snapshot(self.components, sections, policy)
+        self.snapshot_sections = merge_sections(self.snapshot_sections, sections, policy)
+        return scheduled
+
+    def export_snapshot(self, path: str) -> int:
+        """Write every engine cache (live where built, else its JSON file) to a snapshot."""
+        return write_snapshot(path, collect(self.components, self.snapshot_sections))
 
 
 # Optional: Add a method to test name extraction in isolation
@@ -1,7 +1,102 @@
 import re
+from typing import Dict, List
+
+
+class ValidatedEmails:
+    """
+    Result of `EmailValidator.validate_batch`: row-aligned arrays for the
+    whole input plus the deduplicated valid emails the engine should process.
+    """
+
+    def __init__(self, original, normalized, valid, local, local_base, domain, inverse, uniques):
+        self.original = original        # input values, one per row
+        self.normalized = normalized    # stripped, lowercased, punycode domain
+        self.valid = valid              # bool per row
+        self.local = local              # local part per row
+        self.local_base = local_base    # local part without "+tag"
+        self.domain = domain            # ASCII (IDNA) domain per row
+        self.inverse = inverse          # row -> index into `uniques`, -1 if invalid
+        self.uniques = uniques          # positions of the first row of each unique valid email
+
+    def __len__(self) -> int:
+        return len(self.original)
+
+    @property
+    def unique_emails(self) -> List[str]:
+        return [self.normalized[i] for i in self.uniques]
+
+    @property
+    def unique_parts(self) -> List[tuple]:
+        """(email, local_base, domain) for each unique valid email."""
+        return [(self.normalized[i], self.local_base[i], self.domain[i]) for i in self.uniques]
+
+    def expand(self, unique_results: List[Dict]) -> List[Dict]:
+        """Map per-unique results back onto every input row, in input order."""
+        rows = []
+        for idx, pos in enumerate(self.inverse):
+            if pos < 0:
+                rows.append({"email": self.original[idx], "error": "Invalid email format"})
+            else:
+                rows.append(dict(unique_results[pos], email=self.original[idx]))
+        return rows
+
 
 class EmailValidator:
+    PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+    _regex = re.compile(PATTERN)
+
     @staticmethod
     def validate_email(email: str) -> bool:
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return EmailValidator._regex.match(email) is not None
+
+    @staticmethod
+    def to_ascii_domain(domain: str) -> str:
+        """Encode an internationalized domain (IDN) to punycode; '' if impossible."""
+        try:
+            return domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return ""
+
+    @staticmethod
+    def validate_batch(emails) -> ValidatedEmails:
+        """
+        Validate and normalize a whole column at once.
+        Accepts a list, a pandas Series or a pyarrow array. Rows are
+        stripped and lowercased, IDN domains are converted to punycode,
+        `+tag` suffixes are split off for name parsing and exact
+        duplicates are collapsed, so the engine runs once per unique email.
+        """
+        import pandas as pd
+
+        if hasattr(emails, "to_pandas"):
+            emails = emails.to_pandas()
+        original = pd.Series(emails, dtype=object).reset_index(drop=True)
+
+        text = original.where(original.notna(), "").astype(str).str.strip().str.lower()
+        parts = text.str.rsplit("@", n=1, expand=True).reindex(columns=[0, 1])
+        local = parts[0].fillna("").astype(str)
+        domain = parts[1].fillna("").astype(str).str.rstrip(".")
+
+        # Only non-ASCII domains pay for IDNA encoding
+        idn = domain.str.contains(r"[^\x00-\x7f]", regex=True)
+        if idn.any():
+            domain = domain.copy()
+            domain[idn] = domain[idn].map(EmailValidator.to_ascii_domain)
+
+        normalized = local + "@" + domain
+        valid = normalized.str.match(EmailValidator.PATTERN) & text.str.count("@").eq(1)
+        local_base = local.str.split("+", n=1).str[0]
+
+        codes, _ = pd.factorize(normalized.where(valid))
+        first_rows = pd.Series(range(len(codes)))[codes >= 0].groupby(codes[codes >= 0]).first()
+
+        return ValidatedEmails(
+            original=original.tolist(),
+            normalized=normalized.tolist(),
+            valid=valid.to_numpy(),
+            local=local.tolist(),
+            local_base=local_base.tolist(),
+            domain=domain.tolist(),
+            inverse=codes,
+            uniques=first_rows.tolist()
+        )
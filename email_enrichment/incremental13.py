@@ -0,0 +1,179 @@
+import argparse
+import ast
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from batch_job11 import RESULT_COLUMNS, flatten_result
+from pipeline19 import PIPELINE_PROFILES
+from structured_logging17 import setup_logging
+
+
+CHANGE_COLUMN = "change"
+TIMESTAMP_COLUMN = "enriched_at"
+CONFIDENCE_KEYS = ("domain", "university", "company")
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_iso(value: str) -> Optional[float]:
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def email_key(email: str) -> str:
+    return str(email).strip().lower()
+
+
+def row_to_result(row: Dict) -> Dict:
+    """
+    Rebuild an `enrich_email` result from an exported row. Handles the
+    flat `confidence_*` columns and the older single `confidence`
+    column that holds a stringified dict.
+    """
+    result = {k: v for k, v in row.items() if v != "" and v is not None}
+    confidence = result.pop("confidence", None)
+    if isinstance(confidence, str):
+        try:
+            confidence = ast.literal_eval(confidence)
+        except (ValueError, SyntaxError):
+            confidence = None
+    if not isinstance(confidence, dict):
+        confidence = {}
+    for key in CONFIDENCE_KEYS:
+        value = result.pop(f"confidence_{key}", None)
+        if value is not None:
+            confidence[key] = value
+    if confidence:
+        result["confidence"] = confidence
+    result.pop(CHANGE_COLUMN, None)
+    return result
+
+
+def load_previous(source) -> Dict[str, Dict]:
+    """Load a previous enriched output (path, DataFrame or list of dicts) keyed by email."""
+    import pandas as pd
+
+    if isinstance(source, str):
+        if source.endswith(".xlsx"):
+            df = pd.read_excel(source, keep_default_na=False)
+        else:
+            df = pd.read_csv(source, keep_default_na=False)
+        rows = df.to_dict("records")
+    elif hasattr(source, "to_dict"):
+        rows = source.to_dict("records")
+    else:
+        rows = list(source)
+    return {email_key(r["email"]): row_to_result(r) for r in rows if r.get("email")}
+
+
+class IncrementalEnricher:
+    """
+    Re-enriches only what changed since a previous run: new emails and
+    emails whose domain data is older than `max_age_days`. Stale domains
+    are evicted from the engine caches first, so they are looked up
+    again. Everything else is carried over from the previous output as-is.
+    """
+
+    def __init__(self, engine, max_age_days: float = 30):
+        self.engine = engine
+        self.max_age = max_age_days * 86400
+
+    def stale_domains(self, previous: Dict[str, Dict]) -> set:
+        """Domains with at least one row that is too old, has no timestamp or failed."""
+        cutoff = time.time() - self.max_age
+        stale = set()
+        for result in previous.values():
+            domain = result.get("email_domain")
+            enriched_at = parse_iso(result.get(TIMESTAMP_COLUMN))
+            if "error" in result or enriched_at is None or enriched_at < cutoff:
+                if domain:
+                    stale.add(domain)
+        return stale
+
+    def run(self, emails: List[str], previous: Dict[str, Dict]) -> Tuple[List[Dict], Dict]:
+        stale = self.stale_domains(previous)
+        results: List[Optional[Dict]] = [None] * len(emails)
+        to_enrich: List[int] = []
+        summary = {"total": len(emails), "carried_over": 0, "new": 0, "refreshed": 0, "changed": 0,
+                   "removed": 0, "stale_domains": len(stale), "changed_rows": []}
+
+        for idx, email in enumerate(emails):
+            old = previous.get(email_key(email))
+            if old is None or "error" in old or old.get("email_domain") in stale:
+                to_enrich.append(idx)
+            else:
+                results[idx] = dict(old, email=email, **{CHANGE_COLUMN: "carried_over"})
+                summary["carried_over"] += 1
+
+        if to_enrich:
+            # Otherwise the engine would answer stale domains from its own caches
+            self.engine.invalidate_domains(stale)
+            fresh = self.engine.enrich_batch([emails[i] for i in to_enrich])
+            stamp = now_iso()
+            for idx, result in zip(to_enrich, fresh):
+                old = previous.get(email_key(emails[idx]))
+                if old is None:
+                    change = "new"
+                else:
+                    changed_fields = self.diff(old, result)
+                    change = "changed" if changed_fields else "refreshed"
+                    if changed_fields:
+                        summary["changed_rows"].append({"email": emails[idx], "fields": changed_fields})
+                summary[change] += 1
+                results[idx] = dict(result, **{TIMESTAMP_COLUMN: stamp, CHANGE_COLUMN: change})
+
+        seen = {email_key(e) for e in emails}
+        summary["removed"] = sum(1 for key in previous if key not in seen)
+        summary["enriched"] = len(to_enrich)
+        return results, summary
+
+    @staticmethod
+    def diff(old: Dict, new: Dict) -> List[str]:
+        fields = [c for c in RESULT_COLUMNS if c != "email"]
+        old_flat, new_flat = flatten_result(old), flatten_result(new)
+        return [f for f in fields if str(old_flat.get(f, "")) != str(new_flat.get(f, ""))]
+
+
+def write_output(results: List[Dict], output_path: str) -> None:
+    import pandas as pd
+
+    columns = RESULT_COLUMNS + [TIMESTAMP_COLUMN, CHANGE_COLUMN]
+    results_df = pd.DataFrame([flatten_result(r) for r in results]).reindex(columns=columns)
+    if output_path.endswith(".xlsx"):
+        results_df.to_excel(output_path, index=False, engine="openpyxl")
+    else:
+        results_df.to_csv(output_path, index=False)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Incremental re-enrichment against a previous output")
+    parser.add_argument("previous", help="Previous enriched output (CSV/XLSX)")
+    parser.add_argument("input", help="New input file with an 'Email' column")
+    parser.add_argument("output", help="Where to write the merged output (CSV/XLSX)")
+    parser.add_argument("--max-age-days", type=float, default=30)
+    parser.add_argument("--pipeline", choices=tuple(PIPELINE_PROFILES), default="standard")
+    args = parser.parse_args(argv)
+    setup_logging(console=False)
+
+    from email_enricher1 import EnrichmentEngine
+    from job_queue8 import read_emails
+
+    enricher = IncrementalEnricher(EnrichmentEngine(pipeline=args.pipeline), args.max_age_days)
+    results, summary = enricher.run(read_emails(args.input), load_previous(args.previous))
+    write_output(results, args.output)
+
+    summary_path = f"{args.output}.summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({k: v for k, v in summary.items() if k != "changed_rows"}, indent=2))
+    print(f"Wrote {len(results)} rows to {args.output} (diff summary: {summary_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from profiling18 import PROFILE_MODES
+from pipeline19 import PIPELINE_PROFILES
+from structured_logging17 import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# Shard model
+# -------------------------
+class Shard:
+    """A unit of work: a list of (row_index, email) pairs that share domains."""
+
+    def __init__(self, shard_id: int, rows: List[Tuple[int, str]], attempts: int = 0):
+        self.shard_id = shard_id
+        self.rows = rows
+        self.attempts = attempts
+
+    @property
+    def emails(self) -> List[str]:
+        return [email for _, email in self.rows]
+
+
+def split_into_shards(emails: List[str], shard_size: int = 500) -> List[List[Tuple[int, str]]]:
+    """
+    Split input emails into shards of roughly `shard_size` rows.
+    Rows with the same domain always land in the same shard so that a
+    single worker keeps hitting its own domain caches.
+    """
+    groups: "OrderedDict[str, List[Tuple[int, str]]]" = OrderedDict()
+    for idx, email in enumerate(emails):
+        domain = email.rsplit("@", 1)[-1].strip().lower() if "@" in email else ""
+        groups.setdefault(domain, []).append((idx, email))
+
+    shards: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    for rows in groups.values():
+        # Large domains get a shard (or several) of their own
+        if len(rows) >= shard_size:
+            for start in range(0, len(rows), shard_size):
+                shards.append(rows[start:start + shard_size])
+            continue
+        if current and len(current) + len(rows) > shard_size:
+            shards.append(current)
+            current = []
+        current.extend(rows)
+    if current:
+        shards.append(current)
+    return shards
+
+
+# -------------------------
+# Queue interface
+# -------------------------
+class JobQueue(ABC):
+    """Interface for a shard queue shared by a coordinator and its workers."""
+
+    @abstractmethod
+    def add_shards(self, shards: List[List[Tuple[int, str]]]) -> int:
+        ...
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Shard]:
+        ...
+
+    @abstractmethod
+    def heartbeat(self, shard_id: int, worker_id: str, lease_seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, shard_id: int, worker_id: str, results: List[Dict]) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, shard_id: int, worker_id: str, error: str) -> None:
+        ...
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def iter_results(self) -> Iterator[Tuple[int, Dict]]:
+        ...
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return counts.get("pending", 0) == 0 and counts.get("leased", 0) == 0
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Reference queue backed by a single SQLite file.
+    Works for several processes on one machine, or several machines
+    sharing the file over a filesystem with working locks.
+    """
+
+    def __init__(self, path: str = "enrichment_jobs.db", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shards (
+                    shard_id INTEGER PRIMARY KEY,
+                    rows TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    results TEXT,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_shards_status ON shards(status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per call keeps the queue safe to use from heartbeat threads
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add_shards(self, shards: List[List[Tuple[int, str]]]) -> int:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO shards (rows) VALUES (?)",
+                [(json.dumps(rows),) for rows in shards]
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return len(shards)
+
+    def lease(self, worker_id: str, lease_seconds: float) -> Optional[Shard]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Expired leases with no attempts left will never be picked up again
+            conn.execute(
+                """
+                UPDATE shards
+                SET status = 'failed', worker_id = NULL, lease_expires = NULL,
+                    error = COALESCE(error, 'Lease expired after ' || attempts || ' attempts')
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, self.max_attempts)
+            )
+            row = conn.execute(
+                """
+                SELECT shard_id, rows, attempts FROM shards
+                WHERE attempts < ?
+                  AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+                ORDER BY shard_id LIMIT 1
+                """,
+                (self.max_attempts, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            shard_id, rows, attempts = row
+            conn.execute(
+                """
+                UPDATE shards SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = ?
+                WHERE shard_id = ?
+                """,
+                (worker_id, now + lease_seconds, attempts + 1, shard_id)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return Shard(shard_id, [tuple(r) for r in json.loads(rows)], attempts + 1)
+
+    def heartbeat(self, shard_id: int, worker_id: str, lease_seconds: float) -> bool:
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                """
+                UPDATE shards SET lease_expires = ?
+                WHERE shard_id = ? AND worker_id = ? AND status = 'leased'
+                """,
+                (time.time() + lease_seconds, shard_id, worker_id)
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, shard_id: int, worker_id: str, results: List[Dict]) -> bool:
+        conn = self._connect()
+        try:
+            # Only the current lease holder may commit results
+            cur = conn.execute(
+                """
+                UPDATE shards SET status = 'done', results = ?, lease_expires = NULL, error = NULL
+                WHERE shard_id = ? AND worker_id = ? AND status = 'leased'
+                """,
+                (json.dumps(results), shard_id, worker_id)
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def fail(self, shard_id: int, worker_id: str, error: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                UPDATE shards
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    worker_id = NULL, lease_expires = NULL, error = ?
+                WHERE shard_id = ? AND worker_id = ?
+                """,
+                (self.max_attempts, error, shard_id, worker_id)
+            )
+        finally:
+            conn.close()
+
+    def counts(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+    def iter_results(self) -> Iterator[Tuple[int, Dict]]:
+        conn = self._connect()
+        try:
+            for rows, results, status, error in conn.execute(
+                "SELECT rows, results, status, error FROM shards ORDER BY shard_id"
+            ):
+                rows = json.loads(rows)
+                if status == "done":
+                    for (idx, _), res in zip(rows, json.loads(results)):
+                        yield idx, res
+                else:
+                    for idx, email in rows:
+                        yield idx, {"email": email, "error": error or f"Shard not processed ({status})"}
+        finally:
+            conn.close()
+
+
+# -------------------------
+# Coordinator / Worker / Merge
+# -------------------------
+def coordinate(queue: JobQueue, emails: List[str], shard_size: int = 500) -> int:
+    """
+    Split the input into domain-grouped shards and enqueue them. Shards
+    carry input row indices, so a queue holds exactly one job: refuse to
+    add a second input to a queue that already has shards.
+    """
+    existing = sum(queue.counts().values())
+    if existing:
+        raise ValueError(f"Queue already holds {existing} shards from another input; use a fresh --queue")
+    return queue.add_shards(split_into_shards(emails, shard_size))
+
+
+def run_worker(
+    queue: JobQueue,
+    engine,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 300,
+    heartbeat_interval: float = 60,
+    idle_exit: bool = True,
+    poll_interval: float = 5
+) -> int:
+    """
+    Lease shards until the queue is drained, enrich them with
+    `engine.enrich_batch` and report the results back.
+    Returns the number of shards completed by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    completed = 0
+
+    while True:
+        shard = queue.lease(worker_id, lease_seconds)
+        if shard is None:
+            if idle_exit or queue.is_finished():
+                return completed
+            time.sleep(poll_interval)
+            continue
+
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(heartbeat_interval):
+                if not queue.heartbeat(shard.shard_id, worker_id, lease_seconds):
+                    return
+
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        try:
+            results = engine.enrich_batch(shard.emails)
+        except Exception as e:
+            stop.set()
+            logger.exception("Shard %s failed on %s", shard.shard_id, worker_id)
+            queue.fail(shard.shard_id, worker_id, f"{type(e).__name__}: {e}")
+            continue
+        finally:
+            stop.set()
+            beater.join()
+
+        if queue.complete(shard.shard_id, worker_id, results):
+            completed += 1
+            logger.info("Shard %s done", shard.shard_id, extra={"worker_id": worker_id, "rows": len(results)})
+        else:
+            logger.warning("Shard %s lease lost before completion; results dropped", shard.shard_id)
+
+
+def merge_results(queue: JobQueue, output_path: str) -> int:
+    """Write all shard results to `output_path` (CSV or XLSX) in input order."""
+    import pandas as pd
+
+    ordered = sorted(queue.iter_results(), key=lambda item: item[0])
+    results_df = pd.DataFrame([res for _, res in ordered])
+    if output_path.endswith(".xlsx"):
+        results_df.to_excel(output_path, index=False, engine="openpyxl")
+    else:
+        results_df.to_csv(output_path, index=False)
+    return len(ordered)
+
+
+def read_emails(path: str) -> List[str]:
+    import pandas as pd
+
+    df = pd.read_excel(path) if path.endswith(".xlsx") else pd.read_csv(path)
+    if "Email" not in df.columns:
+        raise ValueError("File must have a column named 'Email'.")
+    return df["Email"].dropna().astype(str).str.strip().tolist()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Distributed batch enrichment")
+    parser.add_argument("--queue", default="enrichment_jobs.db", help="Path to the SQLite job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_coord = sub.add_parser("coordinate", help="Split an input file into shards")
+    p_coord.add_argument("input")
+    p_coord.add_argument("--shard-size", type=int, default=500)
+
+    p_worker = sub.add_parser("worker", help="Process shards until the queue is drained")
+    p_worker.add_argument("--lease-seconds", type=float, default=300)
+    p_worker.add_argument("--heartbeat", type=float, default=60)
+    p_worker.add_argument("--wait", action="store_true", help="Keep polling until every shard is done")
+    p_worker.add_argument("--pipeline", choices=tuple(PIPELINE_PROFILES), default="standard")
+    p_worker.add_argument("--profile", choices=PROFILE_MODES, help="Profile each shard (writes to --profile-dir)")
+    p_worker.add_argument("--profile-dir", default="profiles")
+    p_worker.add_argument("--profile-memory", action="store_true", help="Also report top allocation sites")
+    p_worker.add_argument("--snapshot", help="Warm the caches from this cache snapshot first")
+    p_worker.add_argument("--export-snapshot", help="Write this worker's caches to a snapshot when done")
+
+    p_merge = sub.add_parser("merge", help="Merge finished shard results")
+    p_merge.add_argument("output")
+
+    sub.add_parser("status", help="Show shard counts")
+
+    args = parser.parse_args(argv)
+    setup_logging(console=False)
+    queue = SQLiteJobQueue(args.queue)
+
+    if args.command == "coordinate":
+        try:
+            count = coordinate(queue, read_emails(args.input), args.shard_size)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Enqueued {count} shards into {args.queue}")
+    elif args.command == "worker":
+        from email_enricher1 import EnrichmentEngine
+
+        engine = EnrichmentEngine(pipeline=args.pipeline)
+        if args.profile:
+            engine.profile = {
+                "mode": args.profile,
+                "output_dir": args.profile_dir,
+                "track_memory": args.profile_memory
+            }
+        if args.snapshot:
+            engine.load_snapshot(args.snapshot)
+        done = run_worker(
+            queue, engine,
+            lease_seconds=args.lease_seconds,
+            heartbeat_interval=args.heartbeat,
+            idle_exit=not args.wait
+        )
+        print(f"Worker finished {done} shards")
+        if args.export_snapshot:
+            count = engine.export_snapshot(args.export_snapshot)
+            print(f"Wrote {count} cache entries to {args.export_snapshot}")
+    elif args.command == "merge":
+        count = merge_results(queue, args.output)
+        print(f"Wrote {count} rows to {args.output}")
+    else:
+        print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Mapping
+
+# One lock per cache file, shared by every instance that saves to it
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def file_lock(path: str) -> threading.Lock:
+    key = os.path.abspath(path)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def save_json(path: str, data: Mapping, indent: int = 2) -> None:
+    """
+    Write `data` to `path` atomically: dump to a temp file in the same
+    directory, then os.replace it. Readers never see a half-written
+    file, and the request path and the cache warmer take turns per file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with file_lock(path):
+        # Copy under the lock: the warmer may update the dict from another thread
+        snapshot = dict(data)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(snapshot, f, indent=indent)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
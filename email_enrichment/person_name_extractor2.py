@@ -1,10 +1,17 @@
 import re
 import json
+import logging
+import time
 import requests
 from bs4 import BeautifulSoup
 import spacy
 from functools import lru_cache
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
+
+from domain_key10 import get_domain_key
+from search_provider15 import get_search_provider
+
+logger = logging.getLogger(__name__)
 
 class PersonNameExtractor:
     def __init__(self, language: str = "en"):
@@ -20,7 +27,7 @@ class PersonNameExtractor:
             else:
                 self.nlp = spacy.blank(language)
         except OSError:
-            print(f"⚠️ SpaCy model for '{language}' not found. Using blank pipeline.")
+            logger.warning("SpaCy model for '%s' not found. Using blank pipeline.", language)
             self.nlp = spacy.blank(language)
 
         # Titles often used in names
@@ -48,6 +55,15 @@ class PersonNameExtractor:
         # Pages to check for staff/team/leadership
         self.pages_to_scrape = ["", "/about", "/team", "/leadership", "/founders", "/management"]
 
+        # Optional DnsPreflight shared by the engine; unresolvable domains are not scraped
+        self.preflight = None
+        # Shared, cached and rate-limited search fallback
+        self.search = get_search_provider()
+
+        # Best name found by scraping/search, per registrable domain
+        self.domain_names: Dict[str, Dict] = {}
+        self.names_ttl = 7 * 86400
+
     # -------------------------
     # Email Username Parser
     # -------------------------
@@ -167,17 +183,13 @@ class PersonNameExtractor:
     # -------------------------
     # Fallback DuckDuckGo search
     # -------------------------
-    def duckduckgo_search_names(self, domain: str) -> List[str]:
-        """Search DuckDuckGo and extract names from snippets"""
-        try:
-            url = "https://duckduckgo.com/html"
-            params = {"q": f"{domain} team OR leadership OR founders"}
-            response = requests.get(url, params=params, headers=self.headers, timeout=5)
-            soup = BeautifulSoup(response.content, "html.parser")
-            snippets = " ".join([a.get_text(strip=True) for a in soup.find_all("a", href=True)])
-            return self.extract_names(snippets)
-        except Exception:
-            return []
+    def duckduckgo_search_names(self, domain: str) -> Optional[List[str]]:
+        """Search DuckDuckGo and extract names from snippets; None if the search was skipped"""
+        results = self.search.search(f"{domain} team OR leadership OR founders")
+        if results is None:
+            return None
+        snippets = " ".join(text for _, text in results)
+        return self.extract_names(snippets)
 
     # -------------------------
     # Best Guess Extraction (for domains)
@@ -201,17 +213,38 @@ class PersonNameExtractor:
 
         return None
     
+    def find_domain_name(self, domain: str) -> Tuple[Optional[str], bool]:
+        """Returns (name, complete); `complete` is False when the search fallback was skipped."""
+        # Strategy 3: Scrape the domain website
+        try:
+            scraped_names = self.scrape_website_for_names(domain)
+            if scraped_names:
+                return scraped_names[0], True
+        except Exception:
+            pass
+
+        # Strategy 4: DuckDuckGo fallback
+        try:
+            search_names = self.duckduckgo_search_names(domain)
+            if search_names is None:
+                return None, False
+            if search_names:
+                return search_names[0], True
+        except Exception:
+            pass
+        return None, True
+
     # -------------------------
     # Main Entry Point
     # -------------------------
-    def extract_person_name(self, text: str) -> Optional[str]:
+    def extract_person_name(self, text: str, scrape: bool = True) -> Optional[str]:
         """
         Extract person name from email address or text.
         
         Strategy:
         1. If it's an email, parse the username part
         2. Try NER on the parsed text
-        3. Try scraping the domain (if available)
+        3. Try scraping the domain (if available and `scrape` is set)
         """
         if not text:
             return None
@@ -221,7 +254,9 @@ class PersonNameExtractor:
         
         if email_match:
             username = email_match.group(1)
-            domain = email_match.group(2)
+            # Scrape the registrable domain: mail subdomains rarely serve a website
+            key = get_domain_key(email_match.group(2))
+            domain = key.registrable
             
             # Strategy 1: Parse name from username
             parsed_name = self.parse_name_from_username(username)
@@ -234,21 +269,20 @@ class PersonNameExtractor:
             if names:
                 return names[0]
             
-            # Strategy 3: Scrape the domain website
-            try:
-                scraped_names = self.scrape_website_for_names(domain)
-                if scraped_names:
-                    return scraped_names[0]
-            except Exception:
-                pass
-            
-            # Strategy 4: DuckDuckGo fallback
-            try:
-                search_names = self.duckduckgo_search_names(domain)
-                if search_names:
-                    return search_names[0]
-            except Exception:
-                pass
+            # Webmail homepages and searches never name the mailbox owner, and dead
+            # domains (DNS pre-flight) have nothing to scrape or search
+            if not scrape or key.is_free_email or (self.preflight is not None and self.preflight.is_unreachable(domain)):
+                return None
+
+            # Strategies 3 + 4 hit several pages; every email of a domain shares the answer
+            cached = self.domain_names.get(domain)
+            if cached and time.time() - cached.get("fetched_at", 0) < self.names_ttl:
+                return cached["name"]
+            name, complete = self.find_domain_name(domain)
+            if complete:
+                # A skipped search is no evidence the domain has no name; ask again next time
+                self.domain_names[domain] = {"name": name, "fetched_at": time.time()}
+            return name
         
         else:
             # Not an email - try direct name extraction
@@ -257,7 +291,7 @@ class PersonNameExtractor:
                 return names[0]
             
             # If text looks like a domain, try web scraping
-            if '.' in text and not ' ' in text:
+            if scrape and '.' in text and not ' ' in text:
                 try:
                     return self.extract_best_guess_from_domain(text)
                 except Exception:
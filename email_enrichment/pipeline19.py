@@ -0,0 +1,259 @@
+import logging
+import threading
+import time
+from concurrent.futures import Executor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from domain_type_detector7 import domain_type_label, rule_domain_type
+
+logger = logging.getLogger(__name__)
+
+# Keys every context starts with, before the first stage runs
+PIPELINE_INPUTS = ("email", "email_user", "email_domain", "domain_key")
+
+# Worker threads for concurrent stages; the sampling profiler follows them by name
+STAGE_THREAD_PREFIX = "enrich-stage"
+
+
+# -------------------------
+# Components
+# -------------------------
+class Components:
+    """
+    Builds engine components on first use and shares them. The
+    process-wide DomainScraper (and so one page cache) backs the company
+    finder, the detector and the sector extractor; a pipeline that never
+    asks for the detector never loads GloVe.
+    """
+
+    NAMES = ("scraper", "company_finder", "detector", "name_extractor", "sector_extractor")
+
+    def __init__(self, preflight=None):
+        self.preflight = preflight
+        self._built: Dict[str, Any] = {}
+        # One lock per component, so spaCy and GloVe can load side by side
+        self._locks = {name: threading.Lock() for name in self.NAMES}
+        # Callbacks waiting for a component to be built (e.g. cache snapshot seeding)
+        self._on_build: Dict[str, List[Callable[[Any], None]]] = {name: [] for name in self.NAMES}
+
+    def get(self, name: str):
+        component = self._built.get(name)
+        if component is None:
+            with self._locks[name]:
+                if name not in self._built:
+                    logger.info("Building component %s", name)
+                    component = getattr(self, f"_build_{name}")()
+                    for callback in self._on_build[name]:
+                        callback(component)
+                    self._on_build[name].clear()
+                    self._built[name] = component
+                component = self._built[name]
+        return component
+
+    def when_built(self, name: str, callback: Callable[[Any], None]) -> None:
+        """Run `callback(component)` now if it exists, otherwise right after it is built."""
+        with self._locks[name]:
+            if name not in self._built:
+                self._on_build[name].append(callback)
+                return
+        callback(self._built[name])
+
+    def is_built(self, name: str) -> bool:
+        return name in self._built
+
+    def _build_scraper(self):
+        from domain_scraper6 import get_domain_scraper
+
+        scraper = get_domain_scraper()
+        if self.preflight is not None:
+            scraper.preflight = self.preflight
+        return scraper
+
+    def _build_company_finder(self):
+        from company_finder4 import CompanyFinder
+
+        return CompanyFinder(self.get("scraper"))
+
+    def _build_detector(self):
+        return self.get("company_finder").detector
+
+    def _build_name_extractor(self):
+        from person_name_extractor2 import PersonNameExtractor
+
+        extractor = PersonNameExtractor()
+        extractor.preflight = self.preflight
+        return extractor
+
+    def _build_sector_extractor(self):
+        from sector_extractor5 import SectorExtractor
+
+        return SectorExtractor(self.get("scraper"))
+
+
+# -------------------------
+# Stages
+# -------------------------
+class Stage(NamedTuple):
+    """One pipeline step: reads `inputs` from the context and returns a dict of its `outputs`."""
+    name: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    run: Callable[[Components, Dict, Dict], Dict]
+    options: Dict = {}
+    network: bool = False
+
+
+def revalidate_page(components: Components, ctx: Dict, options: Dict) -> Dict:
+    """Conditionally refetch the company page once it is older than `max_age`, even if still fresh."""
+    key = ctx["domain_key"]
+    if key.is_free_email or key.university:
+        return {"page_changed": False}
+    scraper = components.get("scraper")
+    domain = key.registrable
+    if scraper.preflight is not None and scraper.preflight.is_unreachable(domain):
+        return {"page_changed": False}
+    entry = scraper.page_cache.get(domain)
+    now = time.time()
+    if entry and now - entry.get("fetched_at", 0) < options.get("max_age", 3600):
+        return {"page_changed": False}
+    if entry and now - entry.get("failed_at", 0) < scraper.failure_ttl:
+        # Site was down on the last try; keep using the page we have
+        return {"page_changed": False}
+
+    _, changed = scraper.refresh(domain)
+    if changed:
+        # Derived entries were computed from the old page
+        components.get("company_finder").university_cache.pop(domain, None)
+        components.get("detector").domain_cache.pop(domain, None)
+    return {"page_changed": changed}
+
+
+def find_name(components: Components, ctx: Dict, options: Dict) -> Dict:
+    extractor = components.get("name_extractor")
+    email = f"{ctx['email_user']}@{ctx['email_domain']}"
+    return {"likely_person": extractor.extract_person_name(email, scrape=options.get("scrape", True))}
+
+
+def find_domain_type(components: Components, ctx: Dict, options: Dict) -> Dict:
+    if not options.get("scrape", True):
+        return {"domain_type": domain_type_label(*rule_domain_type(ctx["domain_key"]))}
+    return {"domain_type": components.get("detector").get_domain_type_label(ctx["domain_key"])}
+
+
+def find_university(components: Components, ctx: Dict, options: Dict) -> Dict:
+    finder = components.get("company_finder")
+    return {"university": finder.find_related_university(ctx["domain_key"], scrape=options.get("scrape", True))}
+
+
+def find_company(components: Components, ctx: Dict, options: Dict) -> Dict:
+    finder = components.get("company_finder")
+    return {"company": finder.find_related_company(ctx["domain_key"], scrape=options.get("scrape", True))}
+
+
+def find_sector(components: Components, ctx: Dict, options: Dict) -> Dict:
+    _, university_domain, _ = ctx["university"]
+    _, company_domain, _, detected_sector = ctx["company"]
+    if detected_sector:
+        sector = detected_sector
+    elif company_domain:
+        if options.get("scrape", True):
+            sector = components.get("sector_extractor").extract_sector(company_domain)
+        else:
+            sector = "Unknown"
+    elif university_domain:
+        sector = "Education"
+    else:
+        sector = "Unknown"
+    return {"sector": sector}
+
+
+def lookup_stages(scrape: bool, after: Tuple[str, ...] = ()) -> Tuple[Stage, ...]:
+    """The per-email lookups; `after` adds extra inputs the domain lookups wait for."""
+    options = {"scrape": scrape}
+    return (
+        Stage("name", ("email_user", "email_domain"), ("likely_person",), find_name, options, scrape),
+        Stage("domain_type", ("domain_key",) + after, ("domain_type",), find_domain_type, options, scrape),
+        Stage("university", ("domain_key",) + after, ("university",), find_university, options, scrape),
+        Stage("company", ("domain_key",) + after, ("company",), find_company, options, scrape),
+        Stage("sector", ("university", "company"), ("sector",), find_sector, options, scrape),
+    )
+
+
+PIPELINE_PROFILES: Dict[str, Tuple[Stage, ...]] = {
+    # Knowledge base, suffix rules and username parsing only: no DNS, HTTP, search or GloVe
+    "offline-fast": lookup_stages(scrape=False),
+    # Cached pages within their TTL, scraping and search on a miss
+    "standard": lookup_stages(scrape=True),
+    # As standard, but revalidates each company page older than an hour first
+    "deep-scrape": (
+        Stage("revalidate", ("domain_key",), ("page_changed",), revalidate_page, {"max_age": 3600}, True),
+    ) + lookup_stages(scrape=True, after=("page_changed",)),
+}
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+class Pipeline:
+    """
+    Runs stages in dependency order. Stages whose inputs are all
+    available form a wave; the stages of a wave run concurrently on
+    `executor` (inline when there is none or the wave has one stage).
+    """
+
+    def __init__(self, stages: Sequence[Stage], executor: Optional[Executor] = None):
+        self.stages = tuple(stages)
+        self.executor = executor
+        self.waves = self.plan(self.stages)
+        self.network = any(stage.network for stage in self.stages)
+
+    @staticmethod
+    def plan(stages: Sequence[Stage]) -> List[Tuple[Stage, ...]]:
+        available = set(PIPELINE_INPUTS)
+        produced = [out for stage in stages for out in stage.outputs]
+        if len(produced) != len(set(produced)) or available & set(produced):
+            raise ValueError("Pipeline stages must produce distinct outputs")
+
+        waves: List[Tuple[Stage, ...]] = []
+        pending = list(stages)
+        while pending:
+            ready = tuple(s for s in pending if set(s.inputs) <= available)
+            if not ready:
+                missing = {s.name: sorted(set(s.inputs) - available) for s in pending}
+                raise ValueError(f"Pipeline stages have unsatisfied inputs: {missing}")
+            waves.append(ready)
+            for stage in ready:
+                available.update(stage.outputs)
+            pending = [s for s in pending if s not in ready]
+        return waves
+
+    def run(self, components: Components, ctx: Dict, inline: bool = False) -> Dict[str, float]:
+        """
+        Fill `ctx` with every stage's outputs. Returns per-stage wall time in ms.
+        `inline` runs every stage on the calling thread (e.g. under cProfile).
+        """
+        timings: Dict[str, float] = {}
+        for wave in self.waves:
+            if inline or self.executor is None or len(wave) == 1:
+                outputs = [self._run_stage(stage, components, ctx, timings) for stage in wave]
+            else:
+                futures = [self.executor.submit(self._run_stage, s, components, ctx, timings) for s in wave]
+                # The context stays read-only until the whole wave is done
+                wait(futures)
+                outputs = [future.result() for future in futures]
+            for output in outputs:
+                ctx.update(output)
+        return timings
+
+    @staticmethod
+    def _run_stage(stage: Stage, components: Components, ctx: Dict, timings: Dict[str, float]) -> Dict:
+        started = time.perf_counter()
+        output = stage.run(components, ctx, stage.options)
+        timings[stage.name] = (time.perf_counter() - started) * 1000
+        return output
+
+
+def build_pipeline(profile: str = "standard", executor: Optional[Executor] = None) -> Pipeline:
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile '{profile}', expected one of {tuple(PIPELINE_PROFILES)}")
+    return Pipeline(PIPELINE_PROFILES[profile], executor)
@@ -0,0 +1,247 @@
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Dict, Optional
+
+from pipeline19 import STAGE_THREAD_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Source module -> pipeline stage, for grouping profile output
+STAGE_MODULES = {
+    "domain_type_detector7": "detector",
+    "company_finder4": "CompanyFinder",
+    "person_name_extractor2": "PersonNameExtractor",
+    "domain_scraper6": "DomainScraper",
+    "sector_extractor5": "SectorExtractor",
+    "search_provider15": "search",
+    "domain_key10": "DomainKey",
+    "domain_knowledge9": "knowledge_base",
+    "dns_preflight12": "dns_preflight",
+    "email_validator3": "validator",
+    "email_enricher1": "engine",
+    "pipeline19": "pipeline",
+}
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+def stage_of(filename: str) -> Optional[str]:
+    module = os.path.splitext(os.path.basename(filename))[0]
+    return STAGE_MODULES.get(module)
+
+
+def frame_label(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples one thread's stack, plus the pipeline's stage threads, every
+    `interval` seconds into folded-stack counts.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stage_samples: Counter = Counter()
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id in frames:
+                self.sample(frames[self.thread_id])
+            for thread in threading.enumerate():
+                if thread.name.startswith(STAGE_THREAD_PREFIX) and thread.ident in frames:
+                    # Idle pool threads sit in the executor queue; only count stage work
+                    self.sample(frames[thread.ident], stage_only=True)
+
+    def sample(self, frame, stage_only: bool = False):
+        labels, stage = [], None
+        while frame is not None:
+            labels.append(frame_label(frame.f_code))
+            # Innermost frame that belongs to a pipeline stage owns the sample
+            if stage is None:
+                stage = stage_of(frame.f_code.co_filename)
+                if stage == "pipeline" and frame.f_code.co_name == "run":
+                    stage = "waiting on stage threads"  # already counted on those threads
+            frame = frame.f_back
+        if stage_only and stage is None:
+            return
+        self.stacks[";".join(reversed(labels))] += 1
+        self.stage_samples[stage or "other"] += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class BatchProfiler:
+    """
+    Context manager that profiles the current thread and writes artifacts
+    to `output_dir` (sampling also follows the pipeline's stage threads):
+
+    - `cprofile`: `<name>.pstats` plus caller;callee folded edges in `<name>.collapsed`
+    - `sampling`: full folded stacks in `<name>.collapsed` (flamegraph.pl / speedscope ready)
+    - both: `<name>.stages.json` with time per stage and, with
+      `track_memory`, the top allocation sites in `<name>.memory.txt`
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        mode: str = "cprofile",
+        label: str = "batch",
+        track_memory: bool = False,
+        interval: float = 0.005,
+        top_n: int = 25
+    ):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.label = label
+        self.track_memory = track_memory
+        self.interval = interval
+        self.top_n = top_n
+        self.artifacts: Dict[str, str] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self._started_tracing = False
+
+    def __enter__(self) -> "BatchProfiler":
+        self.started = time.time()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracing = True
+        if self.mode == "cprofile":
+            try:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            except ValueError:
+                # Another profiler (or a nested batch) already owns the hook
+                logger.warning("cProfile unavailable, falling back to sampling for %s", self.label)
+                self._profile, self.mode = None, "sampling"
+        if self.mode == "sampling":
+            self._sampler = _Sampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        memory = None
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self.track_memory:
+            memory = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            # Leave tracing on for whoever started it (e.g. python -X tracemalloc)
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        self.write(memory)
+        return False
+
+    # -------------------------
+    # Artifacts
+    # -------------------------
+    def _path(self, suffix: str) -> str:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        # Milliseconds + pid keep back-to-back batches and parallel workers apart
+        stamp += f"{int(self.started * 1000) % 1000:03d}-{os.getpid()}"
+        return os.path.join(self.output_dir, f"{self.label}-{stamp}{suffix}")
+
+    def write(self, memory=None):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stages: Dict[str, float] = defaultdict(float)
+
+        if self._profile is not None:
+            stats = pstats.Stats(self._profile)
+            self.artifacts["pstats"] = self._path(".pstats")
+            stats.dump_stats(self.artifacts["pstats"])
+
+            edges: Counter = Counter()
+            for (filename, _, func), (_, _, tottime, _, callers) in stats.stats.items():
+                stages[stage_of(filename) or "other"] += tottime
+                callee = f"{os.path.splitext(os.path.basename(filename))[0]}:{func}"
+                for (c_file, _, c_func), caller_stats in callers.items():
+                    caller = f"{os.path.splitext(os.path.basename(c_file))[0]}:{c_func}"
+                    # caller_stats[2] is the callee's own time when called from this caller
+                    edges[f"{caller};{callee}"] += int(caller_stats[2] * 1e6)
+            self._write_collapsed(edges)
+        else:
+            self._write_collapsed(self._sampler.stacks)
+            for stage, samples in self._sampler.stage_samples.items():
+                stages[stage] = samples * self.interval
+
+        report = {
+            "mode": self.mode,
+            "wall_seconds": round(time.time() - self.started, 3),
+            "stage_seconds": {k: round(v, 4) for k, v in sorted(stages.items(), key=lambda kv: -kv[1])},
+        }
+        if memory is not None:
+            report["memory_top"] = self._write_memory(memory)
+        self.artifacts["stages"] = self._path(".stages.json")
+        with open(self.artifacts["stages"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.report = report
+
+    def _write_collapsed(self, stacks: Counter):
+        self.artifacts["collapsed"] = self._path(".collapsed")
+        with open(self.artifacts["collapsed"], "w") as f:
+            for stack, weight in stacks.most_common():
+                if weight > 0:
+                    f.write(f"{stack} {weight}\n")
+
+    def _write_memory(self, snapshot) -> list:
+        top = snapshot.statistics("lineno")[:self.top_n]
+        by_stage: Dict[str, int] = defaultdict(int)
+        for stat in snapshot.statistics("filename"):
+            by_stage[stage_of(stat.traceback[0].filename) or "other"] += stat.size
+
+        self.artifacts["memory"] = self._path(".memory.txt")
+        with open(self.artifacts["memory"], "w") as f:
+            f.write("Allocated bytes by stage\n")
+            for stage, size in sorted(by_stage.items(), key=lambda kv: -kv[1]):
+                f.write(f"  {stage:<20} {size / 1024:>10.1f} KiB\n")
+            f.write(f"\nTop {self.top_n} allocation sites\n")
+            for stat in top:
+                frame = stat.traceback[0]
+                f.write(f"  {stat.size / 1024:>10.1f} KiB  {stat.count:>8} blocks  {frame.filename}:{frame.lineno}\n")
+        return [
+            {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "kib": round(s.size / 1024, 1)}
+            for s in top[:10]
+        ]
+
+
+def profiler_from_env(label: str = "batch"):
+    """
+    Opt-in profiling without code changes:
+    ENRICHMENT_PROFILE=cprofile|sampling, ENRICHMENT_PROFILE_DIR (default "profiles"),
+    ENRICHMENT_PROFILE_MEMORY=1 for tracemalloc. Returns a no-op context when
+    unset, or with a warning when the mode is not one of PROFILE_MODES.
+    """
+    mode = os.environ.get("ENRICHMENT_PROFILE", "").strip().lower()
+    if not mode:
+        return contextlib.nullcontext()
+    if mode not in PROFILE_MODES:
+        logger.warning("Ignoring ENRICHMENT_PROFILE=%r, expected one of %s", mode, PROFILE_MODES)
+        return contextlib.nullcontext()
+    return BatchProfiler(
+        output_dir=os.environ.get("ENRICHMENT_PROFILE_DIR", "profiles"),
+        mode=mode,
+        label=label,
+        track_memory=os.environ.get("ENRICHMENT_PROFILE_MEMORY", "") in ("1", "true", "yes")
+    )
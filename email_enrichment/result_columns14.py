@@ -0,0 +1,177 @@
+import sys
+from array import array
+from typing import Dict, List, Optional
+
+
+CONFIDENCE_LEVELS = ("Low", "Medium", "High")
+_CONFIDENCE_CODES = {level: code for code, level in enumerate(CONFIDENCE_LEVELS)}
+
+
+class _Categorical:
+    """Dictionary-encoded column: int32 codes into a list of interned labels (-1 = missing)."""
+
+    def __init__(self, capacity: int):
+        self.codes = array("i", [-1]) * capacity
+        self.labels: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def grow(self, capacity: int):
+        # New buffer instead of an in-place resize: exported views stay valid
+        self.codes = self.codes + array("i", [-1]) * (capacity - len(self.codes))
+
+    def set(self, row: int, value: Optional[str]):
+        if value is None:
+            self.codes[row] = -1
+            return
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.labels)
+            self.labels.append(sys.intern(value))
+        self.codes[row] = code
+
+    def get(self, row: int) -> Optional[str]:
+        code = self.codes[row]
+        return self.labels[code] if code >= 0 else None
+
+
+class ResultColumns:
+    """
+    Columnar store for batch results.
+
+    Rows are appended into preallocated buffers: free-text fields as
+    lists of interned strings, low-cardinality labels (`domain_type`,
+    `sector`, "N/A" fields) as dictionary codes, and each confidence
+    level as an int8 code. `row(i)` rebuilds exactly the dict
+    `enrich_email` returns, so the per-row API stays a view.
+    """
+
+    TEXT_COLUMNS = ("email", "email_domain", "likely_person", "company_domain", "error")
+    LABEL_COLUMNS = ("domain_type", "sector", "related_university", "university_domain", "related_company")
+    CONFIDENCE_COLUMNS = ("domain", "university", "company")
+    FIELD_ORDER = (
+        "email", "email_domain", "domain_type", "likely_person", "related_university",
+        "university_domain", "related_company", "company_domain", "sector"
+    )
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(capacity, 1)
+        self.size = 0
+        self.text: Dict[str, List[Optional[str]]] = {c: [None] * self.capacity for c in self.TEXT_COLUMNS}
+        self.labels: Dict[str, _Categorical] = {c: _Categorical(self.capacity) for c in self.LABEL_COLUMNS}
+        self.confidence: Dict[str, array] = {c: array("b", [-1]) * self.capacity for c in self.CONFIDENCE_COLUMNS}
+
+    def __len__(self) -> int:
+        return self.size
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for values in self.text.values():
+            values.extend([None] * (new_capacity - self.capacity))
+        for column in self.labels.values():
+            column.grow(new_capacity)
+        for name, codes in self.confidence.items():
+            self.confidence[name] = codes + array("b", [-1]) * (new_capacity - self.capacity)
+        self.capacity = new_capacity
+
+    def append(self, result: Dict) -> int:
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        for name, values in self.text.items():
+            value = result.get(name)
+            values[row] = sys.intern(value) if isinstance(value, str) else value
+        for name, column in self.labels.items():
+            column.set(row, result.get(name))
+        confidence = result.get("confidence") or {}
+        for name, codes in self.confidence.items():
+            codes[row] = _CONFIDENCE_CODES.get(confidence.get(name), -1)
+        self.size += 1
+        return row
+
+    def extend(self, results) -> None:
+        for result in results:
+            self.append(result)
+
+    # -------------------------
+    # Row view
+    # -------------------------
+    def row(self, i: int) -> Dict:
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        error = self.text["error"][i]
+        if error is not None:
+            return {"email": self.text["email"][i], "error": error}
+        result = {}
+        for name in self.FIELD_ORDER:
+            if name in self.text:
+                result[name] = self.text[name][i]
+            else:
+                result[name] = self.labels[name].get(i)
+        result["confidence"] = {
+            name: CONFIDENCE_LEVELS[codes[i]] if codes[i] >= 0 else None
+            for name, codes in self.confidence.items()
+        }
+        return result
+
+    def rows(self) -> List[Dict]:
+        return [self.row(i) for i in range(self.size)]
+
+    # -------------------------
+    # Conversions
+    # -------------------------
+    def _codes(self, buffer: array, dtype):
+        import numpy as np
+
+        # View over the array buffer, trimmed to the filled rows. Consumers still copy:
+        # Categorical.from_codes and pa.array(mask=...) build their own buffers
+        return np.frombuffer(buffer, dtype=dtype)[:self.size]
+
+    def to_pandas(self, flat_confidence: bool = True):
+        """DataFrame with categorical label/confidence columns built straight from the code buffers."""
+        import pandas as pd
+
+        data = {}
+        for name in self.FIELD_ORDER:
+            if name in self.text:
+                data[name] = pd.Series(self.text[name][:self.size], dtype=object)
+            else:
+                column = self.labels[name]
+                data[name] = pd.Categorical.from_codes(self._codes(column.codes, "int32"), categories=column.labels)
+        for name, codes in self.confidence.items():
+            data[f"confidence_{name}"] = pd.Categorical.from_codes(
+                self._codes(codes, "int8"), categories=list(CONFIDENCE_LEVELS), ordered=True
+            )
+        data["error"] = pd.Series(self.text["error"][:self.size], dtype=object)
+        df = pd.DataFrame(data)
+        if not flat_confidence:
+            df["confidence"] = [self.row(i).get("confidence") for i in range(self.size)]
+            df = df.drop(columns=[f"confidence_{n}" for n in self.CONFIDENCE_COLUMNS])
+        return df
+
+    def to_arrow(self):
+        """pyarrow Table with dictionary-encoded label and confidence columns."""
+        import pyarrow as pa
+
+        arrays, names = [], []
+        for name in self.FIELD_ORDER:
+            if name in self.text:
+                arrays.append(pa.array(self.text[name][:self.size], type=pa.string()))
+            else:
+                column = self.labels[name]
+                codes = self._codes(column.codes, "int32")
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, mask=codes < 0), pa.array(column.labels, type=pa.string())
+                ))
+            names.append(name)
+        for name, buffer in self.confidence.items():
+            codes = self._codes(buffer, "int8")
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(codes, mask=codes < 0), pa.array(list(CONFIDENCE_LEVELS))
+            ))
+            names.append(f"confidence_{name}")
+        arrays.append(pa.array(self.text["error"][:self.size], type=pa.string()))
+        names.append("error")
+        return pa.Table.from_arrays(arrays, names=names)
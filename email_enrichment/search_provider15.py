@@ -0,0 +1,213 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import requests
+from bs4 import BeautifulSoup
+
+
+# A search hit is an (href, anchor_text) pair
+SearchResults = List[Tuple[str, str]]
+
+
+# -------------------------
+# Backends
+# -------------------------
+class SearchBackend(ABC):
+    """Runs one query against a search engine. Raise on failure so the breaker can count it."""
+
+    @abstractmethod
+    def search(self, query: str) -> SearchResults:
+        ...
+
+
+class DuckDuckGoBackend(SearchBackend):
+    URL = "https://duckduckgo.com/html"
+
+    def __init__(self, timeout: float = 5):
+        self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        self.timeout = timeout
+
+    def search(self, query: str) -> SearchResults:
+        response = requests.get(self.URL, params={"q": query}, headers=self.headers, timeout=self.timeout)
+        # DuckDuckGo answers throttled clients with 202/403/429 and an empty page
+        if response.status_code != 200:
+            raise requests.HTTPError(f"Search returned HTTP {response.status_code}", response=response)
+        soup = BeautifulSoup(response.content, "html.parser")
+        return [(a.get("href", ""), a.get_text(strip=True)) for a in soup.find_all("a", href=True)]
+
+
+class StubSearchBackend(SearchBackend):
+    """Local backend for tests: a {query: results} dict or a callable."""
+
+    def __init__(self, results: Union[Dict[str, SearchResults], Callable[[str], SearchResults]]):
+        self.results = results
+        self.calls: List[str] = []
+
+    def search(self, query: str) -> SearchResults:
+        self.calls.append(query)
+        if callable(self.results):
+            return self.results(query)
+        return self.results.get(query, [])
+
+
+# -------------------------
+# Rate limiting and circuit breaking
+# -------------------------
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts up to `capacity`."""
+
+    def __init__(self, rate: float = 1.0, capacity: int = 5):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = 0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds; then lets a single trial call through.
+    A trial that never reports back is replaced after another `reset_timeout`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 120):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_started = now
+                return True
+            if self.state == self.HALF_OPEN and now - self.trial_started >= self.reset_timeout:
+                # The last trial was admitted but never recorded; let another one through
+                self.trial_started = now
+                return True
+            return False
+
+    def release(self):
+        """Give back a trial that was allowed but never ran; the next call may try again."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# -------------------------
+# Provider
+# -------------------------
+class SearchProvider:
+    """
+    Shared search fallback: query-result cache, token-bucket rate limit
+    and a circuit breaker in front of a pluggable backend. While the
+    breaker is open or the bucket is empty, searches return None at once
+    instead of burning a full request timeout; None means "not searched",
+    so callers don't cache an answer derived from it the way they would
+    an empty result list.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SearchBackend] = None,
+        cache_size: int = 5000,
+        cache_ttl: float = 86400,
+        rate: float = 0.5,
+        burst: int = 3,
+        max_wait: float = 2.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.backend = backend or DuckDuckGoBackend()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.breaker = breaker or CircuitBreaker()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, query: str) -> Optional[SearchResults]:
+        with self._lock:
+            hit = self._cache.get(query)
+            if hit is None:
+                return None
+            results, expires = hit
+            if expires < time.time():
+                del self._cache[query]
+                return None
+            self._cache.move_to_end(query)
+            return results
+
+    def _store(self, query: str, results: SearchResults):
+        with self._lock:
+            self._cache[query] = (results, time.time() + self.cache_ttl)
+            self._cache.move_to_end(query)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def search(self, query: str) -> Optional[SearchResults]:
+        key = query.strip().lower()
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        if not self.breaker.allow():
+            return None
+        if not self.bucket.acquire(self.max_wait):
+            # Rate limited: a half-open trial must not stay claimed by a call that never ran
+            self.breaker.release()
+            return None
+        try:
+            results = self.backend.search(query)
+        except Exception:
+            self.breaker.record_failure()
+            return None
+        self.breaker.record_success()
+        self._store(key, results)
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_search_provider() -> SearchProvider:
+    """Process-wide provider shared by DomainScraper and PersonNameExtractor."""
+    return SearchProvider()
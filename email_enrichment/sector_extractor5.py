@@ -1,16 +1,26 @@
-from domain_scraper6 import DomainScraper
+import time
+from typing import Dict, Optional, Union
+
+from domain_scraper6 import DomainScraper, get_domain_scraper, is_provisional
+from domain_key10 import DomainKey, as_domain_key
 
 class SectorExtractor:
-    def __init__(self):
-        self.scraper = DomainScraper()
-        self._cache = {}
+    def __init__(self, scraper: Optional[DomainScraper] = None):
+        self.scraper = scraper or get_domain_scraper()
+        # registrable domain -> {"sector": ..., "updated_at": ...}
+        self.sector_cache: Dict[str, Dict] = {}
 
-    def extract_sector(self, company_domain: str) -> str:
+    def extract_sector(self, company_domain: Union[str, DomainKey]) -> str:
         if not company_domain:
             return "Unknown"
-        if company_domain in self._cache:
-            return self._cache[company_domain]
+        company_domain = as_domain_key(company_domain).registrable
+        cached = self.sector_cache.get(company_domain)
+        if cached is not None:
+            # Older cache snapshots hold the bare sector string
+            return cached["sector"] if isinstance(cached, dict) else cached
         company_info = self.scraper.get_domain_info(company_domain)
         sector = company_info.get("sector", "Unknown")
-        self._cache[company_domain] = sector
+        if not is_provisional(company_info):
+            # Unresolved or unsearched domains are retried on the next lookup instead of pinned to "Unknown"
+            self.sector_cache[company_domain] = {"sector": sector, "updated_at": time.time()}
         return sector
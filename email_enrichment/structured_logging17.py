@@ -0,0 +1,133 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields (timings etc.) become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and key != "sample":
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """
+    The stock `prepare` formats the record, folding the traceback into
+    `msg` and dropping exc_info. This one only merges the message args
+    and renders the traceback into `exc_text`, so the listener's
+    formatters still see it as a separate field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Don't keep the traceback's frames alive while the record waits in the queue
+            record.exc_info = None
+        return record
+
+
+class RowSamplingFilter(logging.Filter):
+    """
+    Thins out per-row records (logged with `extra={"sample": True}`):
+    keeps a random `sample_rate` fraction, capped at `max_per_second`.
+    Warnings and errors, and records without the flag, always pass.
+    """
+
+    def __init__(self, sample_rate: float = 0.01, max_per_second: float = 10):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self._window = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False) or record.levelno >= logging.WARNING:
+            return True
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            window = int(record.created)
+            if window != self._window:
+                self._window, self._count = window, 0
+            self._count += 1
+            return self._count <= self.max_per_second
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(
+    log_dir: str = "log",
+    filename: str = "enrichment_app.log",
+    level: int = logging.INFO,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    console: bool = True,
+    row_sample_rate: float = 0.01,
+    row_max_per_second: float = 10
+) -> QueueListener:
+    """
+    Route all logging through a queue: callers only enqueue records and a
+    background listener formats them and writes size-rotated JSON lines
+    (plus plain console output). Safe to call repeatedly, e.g. on every
+    Streamlit rerun; only the first call configures anything.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, filename), maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s"))
+        handlers.append(console_handler)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    queue_handler = StructuredQueueHandler(log_queue)
+    # Sample before enqueueing so dropped rows cost nothing downstream
+    queue_handler.addFilter(RowSamplingFilter(row_sample_rate, row_max_per_second))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,93 @@
+import pytest
+
+from cache_snapshot20 import SnapshotEntry, merge_sections, read_snapshot, snapshot_info, wins, write_snapshot
+
+
+def sections(**entries):
+    return {"university": {key: SnapshotEntry(*entry) for key, entry in entries.items()}}
+
+
+OLD_HIGH = (100.0, 3, ["Acme University", "High", 100.0])
+NEW_LOW = (200.0, 1, [None, "Low", 200.0])
+
+
+def test_write_read_round_trip(tmp_path):
+    path = str(tmp_path / "cache.eecs")
+    data = {
+        "university": {"acme.edu": SnapshotEntry(*OLD_HIGH)},
+        "sector": {"büro.de": SnapshotEntry(5.0, 0, {"sector": "Unknown", "updated_at": 5.0})},
+        # Large enough to be stored compressed
+        "names": {f"d{i}.com": SnapshotEntry(float(i), 0, {"name": None, "fetched_at": i}) for i in range(200)},
+    }
+
+    assert write_snapshot(path, data, created_at=42.0) == 202
+    created_at, loaded = read_snapshot(path)
+    assert created_at == 42.0
+    assert loaded["university"]["acme.edu"] == SnapshotEntry(*OLD_HIGH)
+    assert loaded["sector"]["büro.de"].value == {"sector": "Unknown", "updated_at": 5.0}
+    assert loaded["names"] == data["names"]
+
+    info = snapshot_info(path)["sections"]
+    assert info["names"]["compressed"] and not info["university"]["compressed"]
+
+
+def test_read_only_requested_sections(tmp_path):
+    path = str(tmp_path / "cache.eecs")
+    write_snapshot(path, {**sections(a=OLD_HIGH), "sector": {}})
+
+    _, loaded = read_snapshot(path, names=["sector"])
+    assert list(loaded) == ["sector"]
+
+
+def test_newest_policy_prefers_later_entry():
+    merged = merge_sections(sections(a=OLD_HIGH), sections(a=NEW_LOW), policy="newest")
+    assert merged["university"]["a"].value == NEW_LOW[2]
+
+
+def test_confidence_policy_prefers_higher_rank_then_later():
+    merged = merge_sections(sections(a=OLD_HIGH), sections(a=NEW_LOW), policy="confidence")
+    assert merged["university"]["a"].value == OLD_HIGH[2]
+
+    newer_high = (300.0, 3, ["Acme U", "High", 300.0])
+    merged = merge_sections(merged, sections(a=newer_high), policy="confidence")
+    assert merged["university"]["a"].value == newer_high[2]
+
+
+def test_untimestamped_entry_loses_to_timestamped():
+    legacy = SnapshotEntry(0.0, 3, ["Acme University", "High"])
+    assert wins(SnapshotEntry(*NEW_LOW), legacy, "newest")
+    assert not wins(legacy, SnapshotEntry(*NEW_LOW), "newest")
+
+
+def test_merge_keeps_keys_from_both_sides():
+    merged = merge_sections(sections(a=OLD_HIGH), sections(b=NEW_LOW))
+    assert set(merged["university"]) == {"a", "b"}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="Unknown merge policy"):
+        merge_sections({}, {}, policy="oldest")
+
+
+def test_corrupt_section_names_the_section(tmp_path):
+    path = tmp_path / "cache.eecs"
+    write_snapshot(str(path), sections(a=OLD_HIGH))
+    data = bytearray(path.read_bytes())
+    # The section is stored raw: break the tail of its only JSON value
+    data[-5:] = b"\xff" * 5
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="Corrupt cache snapshot section 'university'"):
+        read_snapshot(str(path))
+
+
+@pytest.mark.parametrize("content, message", [
+    (b"", "empty file"),
+    (b"EECS", "file too short"),
+    (b"NOPE" + b"\0" * 64, "bad magic"),
+])
+def test_not_a_snapshot(tmp_path, content, message):
+    path = tmp_path / "bad.eecs"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match=message):
+        read_snapshot(str(path))
@@ -0,0 +1,81 @@
+import pytest
+
+from dns_preflight12 import DnsPreflight, DnsRecord, Resolver, StubResolver
+
+
+class CountingResolver(StubResolver):
+    def __init__(self, records):
+        super().__init__(records)
+        self.calls = []
+
+    def resolve(self, domain):
+        self.calls.append(domain)
+        return super().resolve(domain)
+
+
+class FlakyResolver(Resolver):
+    def resolve(self, domain):
+        return DnsRecord(domain, [], [], definitive=False)
+
+
+@pytest.fixture
+def resolver():
+    return CountingResolver({"live.com": ["1.2.3.4"], "v6.com": ["::1"]})
+
+
+def test_check_resolves_once_and_caches(resolver):
+    preflight = DnsPreflight(resolver)
+    records = preflight.check(["live.com", "v6.com", "dead.com", "live.com"])
+
+    assert records["live.com"].a == ["1.2.3.4"]
+    assert records["v6.com"].aaaa == ["::1"]
+    assert not records["dead.com"].resolvable
+    preflight.check(["live.com", "dead.com"])
+    assert sorted(resolver.calls) == ["dead.com", "live.com", "v6.com"]
+
+
+def test_only_checked_dead_domains_are_unreachable(resolver):
+    preflight = DnsPreflight(resolver)
+    assert not preflight.is_unreachable("dead.com")
+
+    preflight.check(["live.com", "dead.com"])
+    assert preflight.is_unreachable("dead.com")
+    assert not preflight.is_unreachable("live.com")
+
+
+def test_expired_records_are_resolved_again(resolver):
+    preflight = DnsPreflight(resolver, ttl=-1)
+    preflight.check(["dead.com"])
+
+    assert not preflight.is_unreachable("dead.com")
+    preflight.check(["dead.com"])
+    assert resolver.calls == ["dead.com", "dead.com"]
+
+
+def test_temporary_failures_are_not_cached():
+    preflight = DnsPreflight(FlakyResolver())
+    preflight.check(["slow.com"])
+
+    assert not preflight.is_unreachable("slow.com")
+    with preflight.batch(["slow.com"]):
+        assert not preflight.is_unreachable("slow.com")
+
+
+def test_batch_pins_dead_domains_beyond_cache_size(resolver):
+    preflight = DnsPreflight(resolver, cache_size=1)
+    dead = [f"dead{i}.com" for i in range(5)]
+
+    with preflight.batch(dead):
+        assert all(preflight.is_unreachable(domain) for domain in dead)
+    assert sum(preflight.is_unreachable(domain) for domain in dead) == 1
+
+
+def test_overlapping_batches_keep_shared_pins(resolver):
+    preflight = DnsPreflight(resolver, ttl=-1)
+
+    with preflight.batch(["dead.com", "a.com"]):
+        with preflight.batch(["dead.com"]):
+            pass
+        assert preflight.is_unreachable("dead.com")
+        assert preflight.is_unreachable("a.com")
+    assert not preflight.is_unreachable("dead.com")
@@ -0,0 +1,56 @@
+import math
+
+import pandas as pd
+
+from email_validator3 import EmailValidator
+
+
+def test_idn_domains_are_punycoded_and_deduped():
+    batch = EmailValidator.validate_batch(["x@bücher.de", " X@BÜCHER.de ", "x@xn--bcher-kva.de"])
+
+    assert list(batch.valid) == [True, True, True]
+    assert batch.unique_emails == ["x@xn--bcher-kva.de"]
+    assert list(batch.inverse) == [0, 0, 0]
+
+
+def test_plus_tags_are_split_off_but_not_deduped():
+    batch = EmailValidator.validate_batch(["amy+news@acme.com", "amy@acme.com", "Amy+News@acme.com"])
+
+    assert batch.unique_parts == [
+        ("amy+news@acme.com", "amy", "acme.com"),
+        ("amy@acme.com", "amy", "acme.com"),
+    ]
+    assert list(batch.inverse) == [0, 1, 0]
+
+
+def test_missing_and_invalid_rows_keep_their_position():
+    emails = pd.Series(["a@one.com", None, float("nan"), "not-an-email", "b@@two.com", "a@one.com"])
+    batch = EmailValidator.validate_batch(emails)
+
+    assert list(batch.valid) == [True, False, False, False, False, True]
+    assert batch.unique_emails == ["a@one.com"]
+    assert list(batch.inverse) == [0, -1, -1, -1, -1, 0]
+
+
+def test_expand_maps_results_back_to_every_row():
+    emails = ["a@one.com", "bad", " A@one.com"]
+    batch = EmailValidator.validate_batch(emails)
+    rows = batch.expand([{"email": "a@one.com", "sector": "Technology"}])
+
+    assert [row["email"] for row in rows] == emails
+    assert rows[0]["sector"] == rows[2]["sector"] == "Technology"
+    assert rows[1] == {"email": "bad", "error": "Invalid email format"}
+
+
+def test_nan_original_is_preserved():
+    batch = EmailValidator.validate_batch([float("nan")])
+    row, = batch.expand([])
+
+    assert math.isnan(row["email"]) and row["error"] == "Invalid email format"
+
+
+def test_undecodable_idn_domain_is_invalid():
+    batch = EmailValidator.validate_batch(["x@" + "ü" * 70 + ".de"])
+
+    assert list(batch.valid) == [False]
+    assert batch.unique_emails == []
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from job_queue8 import SQLiteJobQueue, coordinate, merge_results
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+
+
+def test_expired_lease_is_leased_again(queue):
+    queue.add_shards([[(0, "a@one.com")]])
+    first = queue.lease("w1", lease_seconds=-1)
+    second = queue.lease("w2", lease_seconds=60)
+
+    assert second.shard_id == first.shard_id
+    assert second.attempts == 2
+    assert queue.lease("w3", lease_seconds=60) is None
+
+
+def test_live_lease_is_not_handed_out(queue):
+    queue.add_shards([[(0, "a@one.com")]])
+    queue.lease("w1", lease_seconds=60)
+
+    assert queue.lease("w2", lease_seconds=60) is None
+    assert queue.counts() == {"leased": 1}
+
+
+def test_only_lease_holder_completes(queue):
+    queue.add_shards([[(0, "a@one.com")]])
+    stale = queue.lease("w1", lease_seconds=-1)
+    queue.lease("w2", lease_seconds=60)
+
+    assert not queue.complete(stale.shard_id, "w1", [{"email": "a@one.com", "by": "w1"}])
+    assert queue.complete(stale.shard_id, "w2", [{"email": "a@one.com", "by": "w2"}])
+    assert list(queue.iter_results()) == [(0, {"email": "a@one.com", "by": "w2"})]
+
+
+def test_exhausted_expired_lease_fails(queue):
+    queue.add_shards([[(0, "a@one.com")]])
+    queue.lease("w1", lease_seconds=-1)
+    queue.lease("w2", lease_seconds=-1)
+
+    assert queue.lease("w3", lease_seconds=60) is None
+    assert queue.counts() == {"failed": 1}
+    assert queue.is_finished()
+    (idx, result), = queue.iter_results()
+    assert idx == 0 and "Lease expired" in result["error"]
+
+
+def test_fail_requeues_until_attempts_run_out(queue):
+    queue.add_shards([[(0, "a@one.com")]])
+    shard = queue.lease("w1", lease_seconds=60)
+    queue.fail(shard.shard_id, "w1", "boom")
+    assert queue.counts() == {"pending": 1}
+
+    shard = queue.lease("w1", lease_seconds=60)
+    queue.fail(shard.shard_id, "w1", "boom")
+    assert queue.counts() == {"failed": 1}
+
+
+def test_merge_restores_input_order(queue, tmp_path):
+    emails = ["a@one.com", "b@two.com", "c@one.com", "d@three.com", "e@two.com"]
+    coordinate(queue, emails, shard_size=2)
+    while True:
+        shard = queue.lease("w1", lease_seconds=60)
+        if shard is None:
+            break
+        queue.complete(shard.shard_id, "w1", [{"email": e} for e in shard.emails])
+
+    output = tmp_path / "out.csv"
+    assert merge_results(queue, str(output)) == len(emails)
+    assert pd.read_csv(output)["email"].tolist() == emails
+
+
+def test_coordinate_refuses_non_empty_queue(queue):
+    coordinate(queue, ["a@one.com"])
+    with pytest.raises(ValueError):
+        coordinate(queue, ["b@two.com"])
@@ -0,0 +1,73 @@
+import pytest
+
+from result_columns14 import ResultColumns
+
+ROWS = [
+    {
+        "email": "amy@acme.com", "email_domain": "acme.com", "domain_type": "Company",
+        "likely_person": "Amy", "related_university": "N/A", "university_domain": "N/A",
+        "related_company": "Acme", "company_domain": "acme.com", "sector": "Technology",
+        "confidence": {"domain": "High", "university": "Low", "company": "High"},
+    },
+    {"email": "bad", "error": "Invalid email format"},
+    {
+        "email": "bo@mit.edu", "email_domain": "mit.edu", "domain_type": "University",
+        "likely_person": "N/A", "related_university": "Massachusetts Institute of Technology",
+        "university_domain": "mit.edu", "related_company": "N/A", "company_domain": "N/A",
+        "sector": "Education", "confidence": {"domain": "High", "university": "High", "company": "Low"},
+    },
+]
+
+
+@pytest.fixture
+def columns():
+    # Capacity 1 forces the buffers to grow while appending
+    columns = ResultColumns(capacity=1)
+    columns.extend(ROWS)
+    return columns
+
+
+def test_row_round_trips_enrich_results(columns):
+    assert len(columns) == 3
+    assert columns.rows() == ROWS
+    assert list(columns.row(0)) == list(ROWS[0])
+
+
+def test_row_out_of_range(columns):
+    with pytest.raises(IndexError):
+        columns.row(3)
+
+
+def test_labels_are_dictionary_encoded(columns):
+    assert columns.labels["related_company"].labels == ["Acme", "N/A"]
+    assert list(columns.labels["related_company"].codes[:3]) == [0, -1, 1]
+
+
+def test_to_pandas(columns):
+    df = columns.to_pandas()
+
+    assert list(df["email"]) == ["amy@acme.com", "bad", "bo@mit.edu"]
+    assert df["sector"].dtype == "category"
+    assert df["sector"].isna().tolist() == [False, True, False]
+    assert df["confidence_company"].tolist()[0] == "High"
+    assert df["confidence_company"].cat.ordered
+    assert df["error"].tolist() == [None, "Invalid email format", None]
+
+
+def test_to_pandas_nested_confidence(columns):
+    df = columns.to_pandas(flat_confidence=False)
+
+    assert "confidence_domain" not in df.columns
+    assert df["confidence"][2] == ROWS[2]["confidence"]
+    assert df["confidence"][1] is None
+
+
+def test_to_arrow(columns):
+    pa = pytest.importorskip("pyarrow")
+    table = columns.to_arrow()
+
+    assert table.num_rows == 3
+    assert pa.types.is_dictionary(table.schema.field("sector").type)
+    assert table.column("sector").to_pylist() == ["Technology", None, "Education"]
+    assert table.column("confidence_university").to_pylist() == ["Low", None, "High"]
+    assert table.column("error").to_pylist() == [None, "Invalid email format", None]
@@ -0,0 +1,110 @@
+import pytest
+
+from search_provider15 import CircuitBreaker, SearchProvider, StubSearchBackend, TokenBucket
+
+HITS = [("https://acme.com", "Acme software")]
+
+
+class Clock:
+    """Stands in for time.monotonic so breaker timeouts need no sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("search_provider15.time.monotonic", clock)
+    return clock
+
+
+def failing(query):
+    raise RuntimeError("HTTP 429")
+
+
+def provider(backend, breaker=None, burst=10):
+    return SearchProvider(backend, rate=1000, burst=burst, max_wait=0, breaker=breaker)
+
+
+def test_results_are_cached_per_normalized_query():
+    backend = StubSearchBackend({"Acme": HITS})
+    search = provider(backend)
+
+    assert search.search("Acme") == HITS
+    assert search.search("  acme ") == HITS
+    assert backend.calls == ["Acme"]
+
+
+def test_breaker_opens_after_threshold_and_skips_backend(clock):
+    backend = StubSearchBackend(failing)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    search = provider(backend, breaker)
+
+    assert search.search("a") is None
+    assert search.search("b") is None
+    assert breaker.state == CircuitBreaker.OPEN
+    assert search.search("c") is None
+    assert backend.calls == ["a", "b"]
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    search = provider(StubSearchBackend(failing), breaker)
+    search.search("a")
+
+    clock.now += 60
+    assert search.search("b") is None
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 60
+    search.backend = StubSearchBackend({"c": HITS})
+    assert search.search("c") == HITS
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_only_one_half_open_trial_at_a_time(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A trial that never reports back is replaced
+    clock.now += 60
+    assert breaker.allow()
+
+
+def test_rate_limited_call_releases_half_open_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    search = provider(StubSearchBackend({"a": HITS}), breaker, burst=1)
+    search.bucket.tokens = 0
+    search.bucket.rate = 1e-9
+    clock.now += 60
+
+    assert search.search("a") is None
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow()
+
+
+def test_rate_limited_search_returns_none_not_empty():
+    backend = StubSearchBackend({"a": HITS, "b": HITS})
+    search = provider(backend, burst=1)
+    search.bucket.rate = 1e-9
+
+    assert search.search("a") == HITS
+    assert search.search("b") is None
+    assert backend.calls == ["a"]
+
+
+def test_token_bucket_allows_burst_then_refills(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+
+    assert bucket.acquire() and bucket.acquire()
+    assert not bucket.acquire()
+    clock.now += 1
+    assert bucket.acquire()